@@ -1,151 +1,842 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor, Future, CancelledError,
+                                TimeoutError as FuturesTimeoutError)
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any
-from sklearn.cluster import DBSCAN
-from math import radians, cos, sin, asin, sqrt
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union
+import threading
+
+from engine import AnalyticsProcessor
+from incremental import IncrementalDBSCAN, PYTHON_BYTES_PER_POINT
+from windows import parse_duration
+from pyramid import ZoomPyramid, PYRAMID_MAX_ZOOM, MAX_PYRAMID_FEATURES
+from boundaries import MIN_BOUNDARY_VERTICES
+from jobs import JobStore, JobProgress
+from metrics import Histogram, PROMETHEUS_CONTENT_TYPE, format_gauge, reset_peak_rss, peak_rss_mb
+from ingest import (ReportColumns, NDJSON_MIMETYPES, ARROW_STREAM_MIMETYPES, ARROW_FILE_MIMETYPES,
+                    PACKED_MIMETYPE, iter_ndjson, iter_json_array, peek_json_body, read_report_stream,
+                    read_packed_columns, read_arrow_columns, estimate_capacity)
+from serialization import (COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_BYTES, dumps, iter_json, negotiate_encoding,
+                           compress, iter_compress)
+
+
+class AnalyticsJSONProvider(DefaultJSONProvider):
+    # jsonify and app.json encode with serialization.dumps: numpy and pandas values
+    # are written natively and the body is built as bytes, without sorting keys
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode()
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b'\n', mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.json = AnalyticsJSONProvider(app)
 CORS(app)  # Enable CORS for web app integration
 
+# Co-located reports are clustered as one weighted point; coordinates may first be
+# snapped to this many decimal places (1e-10 degrees is far below GPS resolution)
+MAX_SNAP_DECIMALS = 10
+
+# Clustering modes for /v1/analyze: 'dbscan' clusters at one eps_km, 'optics' computes
+# the density hierarchy up to max_eps_km once (cached) and cuts it at eps_km
+CLUSTERING_MODES = ('dbscan', 'optics')
+
+# Rolling windows reported by /v1/analyze/windows unless the request names its own,
+# and the most window positions one request may step through
+DEFAULT_TIME_WINDOWS = ('24h', '7d', '30d')
+MAX_WINDOW_STEPS = 200
+
+# Upper bound on eps_km x min_samples combinations evaluated by one parameter sweep
+MAX_SWEEP_COMBINATIONS = 400
 
-class AnalyticsProcessor:
+# Deepest zoom level a map aggregate pyramid may be built for
+MAX_PYRAMID_ZOOM = 20
+
+# Response layouts for /v1/analyze: 'full' embeds member records, 'lean' returns
+# cluster summaries plus columnar per-report labels
+RESPONSE_MODES = ('full', 'lean')
+
+# Result cache limits for /v1/analyze
+CACHE_MAX_BYTES = int(float(os.environ.get('ANALYTICS_CACHE_MAX_MB', '256')) * 1024 * 1024)
+CACHE_TTL_SECONDS = float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '600'))
+
+# Columns that shape a lean response; full responses echo every column
+LEAN_RESPONSE_COLUMNS = ('latitude', 'longitude', '_id', 'scanResult', 'product')
+
+# Incremental clustering state kept between /v1/analyze/incremental calls: total
+# estimated model size, and how long a dataset may go without updates before its
+# model is dropped
+INCREMENTAL_MAX_BYTES = int(float(os.environ.get('ANALYTICS_INCREMENTAL_MAX_MB', '512')) * 1024 * 1024)
+INCREMENTAL_TTL_SECONDS = float(os.environ.get('ANALYTICS_INCREMENTAL_TTL_SECONDS', '3600'))
+
+
+class ResultCache:
+    # Thread-safe LRU cache with a TTL and a cap on the total estimated size of the
+    # stored values in bytes. Entries larger than the cap are never stored.
     
-    def __init__(self):
-        self.data = None
-        self.clusters = None
-        
-    def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        # Convert decimal degrees to radians
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        
-        # Radius of Earth in kilometers
-        r = 6371
-        return c * r
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[float, int, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
     
-    def calculate_distance_matrix(self, coordinates: np.ndarray) -> np.ndarray:
-        n = len(coordinates)
-        distance_matrix = np.zeros((n, n))
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    lat1, lon1 = coordinates[i]
-                    lat2, lon2 = coordinates[j]
-                    distance_matrix[i][j] = self.haversine_distance(lat1, lon1, lat2, lon2)
-        
-        return distance_matrix
-        
-    def load_data_from_json(self, json_data: List[Dict]) -> None:
-        # Convert JSON data to DataFrame
-        self.data = pd.DataFrame(json_data)
-        
-        # Ensure latitude/longitude are numeric
-        if 'lat' in self.data.columns and 'long' in self.data.columns:
-            self.data['latitude'] = pd.to_numeric(self.data['lat'], errors='coerce')
-            self.data['longitude'] = pd.to_numeric(self.data['long'], errors='coerce')
-        elif 'latitude' not in self.data.columns or 'longitude' not in self.data.columns:
-            raise ValueError("Data must contain 'lat'/'long' or 'latitude'/'longitude' columns")
-            
-        # Drop rows with invalid coordinates
-        self.data = self.data.dropna(subset=['latitude', 'longitude'])
-    
-    def preprocess_data(self) -> None:
-        if self.data is None:
-            raise ValueError("No data loaded.")
-        
-        # Remove duplicates and handle missing values
-        self.data = self.data.drop_duplicates()
-        self.data = self.data.ffill()
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
     
-    def dbscan_clustering(self, eps_km: float = 5.0, min_samples: int = 3) -> Dict[str, Any]:
-        if self.data is None:
-            raise ValueError("No data loaded.")
-        
-        # Check if required columns exist
-        required_cols = ['latitude', 'longitude']
-        if not all(col in self.data.columns for col in required_cols):
-            raise ValueError(f"Data must contain columns: {required_cols}")
-        
-        # Extract coordinates
-        coordinates = self.data[['latitude', 'longitude']].values
-        
-        # Calculate distance matrix using Haversine
-        distance_matrix = self.calculate_distance_matrix(coordinates)
-        
-        # Run DBSCAN with precomputed distance matrix
-        dbscan = DBSCAN(eps=eps_km, min_samples=min_samples, metric='precomputed')
-        cluster_labels = dbscan.fit_predict(distance_matrix)
-        
-        # Add cluster labels to data
-        self.data['cluster'] = cluster_labels
-        self.clusters = cluster_labels
-        
-        # Calculate cluster statistics
-        unique_labels = set(cluster_labels)
-        n_clusters = len(unique_labels) - (1 if -1 in cluster_labels else 0)
-        n_noise = list(cluster_labels).count(-1)
-        
-        # Analyze each cluster
-        cluster_stats = []
-        noise_points = []
-        
-        for label in unique_labels:
-            if label == -1:  # Noise points
-                noise_points = self.data[self.data['cluster'] == label].to_dict('records')
-                continue
-                
-            cluster_points = self.data[self.data['cluster'] == label]
-            
-            # Calculate cluster center (centroid)
-            center_lat = cluster_points['latitude'].mean()
-            center_lng = cluster_points['longitude'].mean()
-            
-            # Calculate cluster radius (max distance from center)
-            max_radius = 0
-            for _, point in cluster_points.iterrows():
-                dist = self.haversine_distance(center_lat, center_lng, 
-                                             point['latitude'], point['longitude'])
-                max_radius = max(max_radius, dist)
-            
-            cluster_info = {
-                'cluster_id': int(label),
-                'size': len(cluster_points),
-                'center': {'latitude': center_lat, 'longitude': center_lng},
-                'radius_km': max_radius,
-                'points': cluster_points.to_dict('records')
+    def put(self, key: str, value: Any, size_bytes: int) -> None:
+        if size_bytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self._bytes + size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size_bytes, value)
+            self._bytes += size_bytes
+    
+    def _remove(self, key: str) -> None:
+        _, size_bytes, _ = self._entries.pop(key)
+        self._bytes -= size_bytes
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
             }
-            
-            cluster_stats.append(cluster_info)
-        
-        # Sort clusters by size (largest first)
-        cluster_stats.sort(key=lambda x: x['size'], reverse=True)
+
+
+def estimate_size_bytes(value: Any) -> int:
+    # Size of the value as it will be serialized in a response
+    return len(dumps(value))
+
+
+def analysis_cache_key(data: pd.DataFrame, params: Dict[str, Any], columns: Optional[List[str]] = None) -> str:
+    # Content address of an analysis: the normalized float64 coordinates, the input
+    # positions they came from, any other columns that reach the response, and the
+    # parameters that influence the result
+    digest = hashlib.sha256()
+    digest.update(data.index.to_numpy(dtype=np.int64).tobytes())
+    digest.update(data['latitude'].to_numpy(dtype=np.float64).tobytes())
+    digest.update(data['longitude'].to_numpy(dtype=np.float64).tobytes())
+    
+    extra = [col for col in (columns if columns is not None else data.columns)
+             if col in data.columns and col not in ('latitude', 'longitude')]
+    for col in sorted(extra, key=str):
+        digest.update(str(col).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(data[col], index=False).to_numpy().tobytes())
+        except TypeError:
+            digest.update(json.dumps(data[col].tolist(), sort_keys=True, default=str).encode())
+    
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+result_cache = ResultCache()
+
+# Models per dataset_id, least recently updated evicted first; every update stores the
+# model again with its new size and expiry
+incremental_models = ResultCache(INCREMENTAL_MAX_BYTES, INCREMENTAL_TTL_SECONDS)
+incremental_models_lock = threading.Lock()
+
+
+class ClusteringBusyError(Exception):
+    pass
+
+
+class ClusteringTimeoutError(Exception):
+    def __init__(self, timeout_seconds: Optional[float]):
+        super().__init__(f'Clustering exceeded {timeout_seconds}s')
+        self.timeout_seconds = timeout_seconds
+
+
+class ClusteringPool:
+    # Bounded process pool for CPU-heavy clustering so request threads stay free for
+    # light endpoints. At most max_workers + max_pending jobs are admitted at once;
+    # further requests are rejected instead of queueing without limit. A worker that
+    # dies (e.g. killed for running out of memory) breaks the executor; it is replaced
+    # and the requests it was serving are answered as busy.
+    
+    def __init__(self, max_workers: int, max_pending: int, timeout_seconds: Optional[float]):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+    
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn keeps workers independent of the server's threads on every platform
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        # Every request on a broken executor ends up here; only the first replaces it
+        with self._lock:
+            if self._executor is executor:
+                self._executor = self._new_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    @property
+    def queue_depth(self) -> int:
+        # Admitted jobs still waiting for a free worker
+        return max(0, self._in_flight - self.max_workers)
+    
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+    
+    def run(self, fn, *args, background: bool = False) -> Any:
+        # Interactive requests are rejected when the pool is saturated and give up after
+        # timeout_seconds; background jobs wait for a slot and run to completion
+        if not self._slots.acquire(blocking=background):
+            raise ClusteringBusyError("All clustering workers are busy; retry later")
+        with self._lock:
+            self._in_flight += 1
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            self._release(None)
+            if isinstance(e, BrokenProcessPool):
+                self._replace_broken(executor)
+                raise ClusteringBusyError("A clustering worker exited unexpectedly; retry later") from None
+            raise
+        future.add_done_callback(self._release)
         
-        results = {
-            'clustering_params': {
-                'eps_km': eps_km,
-                'min_samples': min_samples
-            },
-            'summary': {
-                'total_points': len(coordinates),
-                'n_clusters': n_clusters,
-                'n_noise_points': n_noise,
-                'noise_percentage': (n_noise / len(coordinates)) * 100 if len(coordinates) > 0 else 0
-            },
-            'clusters': cluster_stats,
-            'noise_points': noise_points,
-            'timestamp': datetime.now().isoformat()
+        try:
+            return future.result(timeout=None if background else self.timeout_seconds)
+        except FuturesTimeoutError:
+            # A queued job is dropped; one already running finishes in the background
+            # and frees its slot when done
+            future.cancel()
+            raise ClusteringTimeoutError(self.timeout_seconds) from None
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise ClusteringBusyError("A clustering worker exited unexpectedly; retry later") from None
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+clustering_pool: Optional[ClusteringPool] = None
+
+
+def configure_clustering_pool(max_workers: int, max_pending: int, timeout_seconds: Optional[float]) -> None:
+    global clustering_pool
+    clustering_pool = ClusteringPool(max_workers, max_pending, timeout_seconds)
+
+
+def shutdown_clustering_pool() -> None:
+    global clustering_pool
+    if clustering_pool is not None:
+        clustering_pool.shutdown()
+        clustering_pool = None
+
+
+def task_diagnostics(processor: AnalyticsProcessor) -> Dict[str, Any]:
+    # Stage times and peak memory of a clustering task, returned next to its results
+    # since the task may have run in a worker process
+    return {'stage_seconds': dict(processor.stage_timings), 'peak_rss_mb': peak_rss_mb()}
+
+
+def task_processor(data: pd.DataFrame, options: Dict[str, Any],
+                   progress_callback: Optional[Callable[[str, str], None]] = None) -> AnalyticsProcessor:
+    # Processor a clustering task runs on, holding the data the server process prepared
+    processor = AnalyticsProcessor(distance_dtype=options.get('distance_dtype', 'float64'))
+    processor.progress_callback = progress_callback
+    processor.data = data
+    return processor
+
+
+def cluster_report_data(data: pd.DataFrame, options: Dict[str, Any],
+                        progress_callback: Optional[Callable[[str, str], None]] = None
+                        ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Module-level so the clustering pool can run it in a worker process; returns the
+    # results and the task's diagnostics
+    processor = task_processor(data, options, progress_callback)
+    results = processor.dbscan_clustering(eps_km=options['eps_km'], min_samples=options['min_samples'],
+                                          neighbor_backend=options['neighbor_backend'], n_jobs=options['n_jobs'],
+                                          include_points=(options['response_mode'] == 'full'),
+                                          collapse_points=options['collapse_points'],
+                                          snap_decimals=options['snap_decimals'])
+    if options.get('cluster_boundaries'):
+        results['boundaries'] = processor.build_cluster_boundaries(options['boundary_max_vertices'])
+    diagnostics = task_diagnostics(processor)
+    if options.get('zoom_pyramid'):
+        # Returned beside the results rather than in them since execute_analysis
+        # caches it on its own
+        diagnostics['zoom_pyramid'] = processor.build_zoom_pyramid(options['pyramid_max_zoom'])
+    return results, diagnostics
+
+
+def hierarchy_report_data(data: pd.DataFrame, options: Dict[str, Any],
+                          progress_callback: Optional[Callable[[str, str], None]] = None
+                          ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    processor = task_processor(data, options, progress_callback)
+    results = processor.compute_density_hierarchy(min_samples=options['min_samples'],
+                                                  max_eps_km=options['max_eps_km'],
+                                                  collapse_points=options['collapse_points'],
+                                                  snap_decimals=options['snap_decimals'])
+    return results, task_diagnostics(processor)
+
+
+def windowed_report_data(data: pd.DataFrame, options: Dict[str, Any],
+                         progress_callback: Optional[Callable[[str, str], None]] = None
+                         ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    processor = task_processor(data, options, progress_callback)
+    results = processor.windowed_clustering(options['windows'], eps_km=options['eps_km'],
+                                            min_samples=options['min_samples'], step=options['step'],
+                                            end=options['end'], max_steps=options['max_steps'])
+    return results, task_diagnostics(processor)
+
+
+def sweep_report_data(data: pd.DataFrame, options: Dict[str, Any],
+                      progress_callback: Optional[Callable[[str, str], None]] = None
+                      ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    processor = task_processor(data, options, progress_callback)
+    results = processor.dbscan_parameter_sweep(options['eps_km'], options['min_samples'],
+                                               collapse_points=options['collapse_points'],
+                                               snap_decimals=options['snap_decimals'])
+    return results, task_diagnostics(processor)
+
+
+def run_clustering(data: pd.DataFrame, options: Dict[str, Any],
+                   progress_callback: Optional[Callable[[str, str], None]] = None,
+                   background: bool = False,
+                   task: Callable[..., Tuple[Dict[str, Any], Dict[str, Any]]] = cluster_report_data
+                   ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Inline under the development server; in a worker process when serve.py set up a pool
+    if clustering_pool is None:
+        return task(data, options, progress_callback)
+    return clustering_pool.run(run_pooled_task, task, data, options, progress_callback, background=background)
+
+
+def run_pooled_task(task: Callable[..., Tuple[Dict[str, Any], Dict[str, Any]]], data: pd.DataFrame,
+                    options: Dict[str, Any], progress_callback: Optional[Callable[[str, str], None]]
+                    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Workers are reused across requests, so their peak memory restarts with each task
+    reset_peak_rss()
+    return task(data, options, progress_callback)
+
+
+class PayloadError(ValueError):
+    # Request body problems, answered with {'error': message} and status_code
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Types of the clustering parameters when they come from the query string of a
+# streamed or binary request
+QUERY_PARAMETER_TYPES = {
+    'eps_km': float,
+    'min_samples': int,
+    'n_jobs': int,
+    'neighbor_backend': str,
+    'distance_dtype': str,
+    'response_mode': str,
+    'use_cache': lambda value: value.lower() not in ('0', 'false', 'no'),
+    'collapse_points': lambda value: value.lower() not in ('0', 'false', 'no'),
+    'snap_decimals': int,
+    'clustering_mode': str,
+    'max_eps_km': float,
+    'zoom_pyramid': lambda value: value.lower() not in ('0', 'false', 'no'),
+    'pyramid_max_zoom': int,
+    'cluster_boundaries': lambda value: value.lower() not in ('0', 'false', 'no'),
+    'boundary_max_vertices': int,
+    'stream_response': lambda value: value.lower() not in ('0', 'false', 'no')
+}
+
+
+# A sweep takes comma-separated lists, e.g. ?eps_km=0.5,1,2&min_samples=3,5
+SWEEP_QUERY_PARAMETER_TYPES = {
+    **QUERY_PARAMETER_TYPES,
+    'eps_km': lambda value: [float(item) for item in value.split(',')],
+    'min_samples': lambda value: [int(item) for item in value.split(',')]
+}
+
+
+# Windowed analysis takes a comma-separated list of window lengths, e.g. ?windows=24h,7d
+WINDOW_QUERY_PARAMETER_TYPES = {
+    **QUERY_PARAMETER_TYPES,
+    'windows': lambda value: value.split(','),
+    'step': str,
+    'end': str,
+    'max_steps': int
+}
+
+
+def parameters_from_query(args, parameter_types: Dict[str, Callable[[str], Any]] = QUERY_PARAMETER_TYPES) -> Dict[str, Any]:
+    params = {}
+    for name, convert in parameter_types.items():
+        if name in args:
+            try:
+                params[name] = convert(args[name])
+            except ValueError:
+                raise ValueError(f'Invalid value for {name}: {args[name]}')
+    return params
+
+
+def read_analysis_request(query_parameter_types: Dict[str, Callable[[str], Any]] = QUERY_PARAMETER_TYPES
+                          ) -> Tuple[Union[List[Dict], ReportColumns], Dict[str, Any]]:
+    # Reports and raw parameters from the current request. A JSON object body carries
+    # both ({"reports": [...], "parameters": {...}}). NDJSON bodies and top-level JSON
+    # arrays are parsed report by report straight into columns, with parameters taken
+    # from the query string, as for binary columnar bodies (packed or Arrow IPC), whose
+    # coordinates arrive as float64 without any text parsing.
+    if request.mimetype == PACKED_MIMETYPE:
+        reports = read_packed_columns(request.get_data())
+        params = parameters_from_query(request.args, query_parameter_types)
+    elif request.mimetype in ARROW_STREAM_MIMETYPES + ARROW_FILE_MIMETYPES:
+        try:
+            reports = read_arrow_columns(request.get_data(), request.mimetype in ARROW_FILE_MIMETYPES)
+        except ImportError:
+            raise PayloadError('Arrow IPC bodies require pyarrow on the analytics server', 415)
+        params = parameters_from_query(request.args, query_parameter_types)
+    elif request.mimetype in NDJSON_MIMETYPES:
+        reports = read_report_stream(iter_ndjson(request.stream), estimate_capacity(request.content_length))
+        params = parameters_from_query(request.args, query_parameter_types)
+    elif not request.is_json:
+        raise PayloadError('Request must be JSON, NDJSON or a binary columnar body')
+    else:
+        head, first_char = peek_json_body(request.stream)
+        if first_char == '[':
+            reports = read_report_stream(iter_json_array(request.stream, head),
+                                         estimate_capacity(request.content_length))
+            params = parameters_from_query(request.args, query_parameter_types)
+        else:
+            try:
+                data = json.loads(head + request.stream.read())
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Invalid JSON body: {e.msg}')
+            payload_error = validate_reports_payload(data)
+            if payload_error:
+                raise PayloadError(payload_error)
+            reports = data['reports']
+            params = data.get('parameters', {})
+    
+    if len(reports) == 0:
+        raise PayloadError('Reports array cannot be empty')
+    return reports, params
+
+
+def validate_reports_payload(data: Any) -> Optional[str]:
+    # Request-shape checks shared by /v1/analyze and /v1/analyze/jobs
+    if not isinstance(data, dict) or 'reports' not in data or not isinstance(data['reports'], list):
+        return 'Missing or invalid "reports" field'
+    if len(data['reports']) == 0:
+        return 'Reports array cannot be empty'
+    return None
+
+
+def is_integer(value: Any) -> bool:
+    # JSON integers only: booleans are ints in Python but not valid counts
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def validate_snap_decimals(snap_decimals: Any) -> None:
+    if snap_decimals is not None and not (is_integer(snap_decimals) and 0 <= snap_decimals <= MAX_SNAP_DECIMALS):
+        raise ValueError(f'snap_decimals must be an integer between 0 and {MAX_SNAP_DECIMALS}')
+
+
+def parse_analysis_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
+    options = {
+        'eps_km': params.get('eps_km', 5.0),
+        'min_samples': params.get('min_samples', 3),
+        'neighbor_backend': params.get('neighbor_backend', 'auto'),
+        'distance_dtype': params.get('distance_dtype', 'float64'),
+        'n_jobs': params.get('n_jobs'),
+        'response_mode': params.get('response_mode', 'full'),
+        'use_cache': params.get('use_cache', True),
+        'collapse_points': params.get('collapse_points', True),
+        'snap_decimals': params.get('snap_decimals'),
+        'clustering_mode': params.get('clustering_mode', 'dbscan'),
+        'max_eps_km': params.get('max_eps_km'),
+        'zoom_pyramid': params.get('zoom_pyramid', False),
+        'pyramid_max_zoom': params.get('pyramid_max_zoom', PYRAMID_MAX_ZOOM),
+        'cluster_boundaries': params.get('cluster_boundaries', True),
+        'boundary_max_vertices': params.get('boundary_max_vertices'),
+        'stream_response': params.get('stream_response', False)
+    }
+    if options['max_eps_km'] is None:
+        options['max_eps_km'] = options['eps_km']
+    
+    if not is_number(options['eps_km']) or options['eps_km'] <= 0:
+        raise ValueError('eps_km must be a positive number')
+    if not is_integer(options['min_samples']) or options['min_samples'] < 1:
+        raise ValueError('min_samples must be an integer of at least 1')
+    if options['response_mode'] not in RESPONSE_MODES:
+        raise ValueError(f'response_mode must be one of: {list(RESPONSE_MODES)}')
+    validate_snap_decimals(options['snap_decimals'])
+    if options['n_jobs'] is not None:
+        # Worker processes are forked per request, so clients cannot ask for more
+        # than the machine has cores
+        if not is_integer(options['n_jobs']) or options['n_jobs'] < 1:
+            raise ValueError('n_jobs must be a positive integer')
+        options['n_jobs'] = min(options['n_jobs'], os.cpu_count() or 1)
+    if options['clustering_mode'] not in CLUSTERING_MODES:
+        raise ValueError(f'clustering_mode must be one of: {list(CLUSTERING_MODES)}')
+    if not is_number(options['max_eps_km']) or options['max_eps_km'] <= 0:
+        raise ValueError('max_eps_km must be a positive number')
+    if options['max_eps_km'] < options['eps_km']:
+        raise ValueError('max_eps_km must be at least eps_km')
+    if not (is_integer(options['pyramid_max_zoom']) and 0 <= options['pyramid_max_zoom'] <= MAX_PYRAMID_ZOOM):
+        raise ValueError(f'pyramid_max_zoom must be an integer between 0 and {MAX_PYRAMID_ZOOM}')
+    if options['boundary_max_vertices'] is not None and not (
+            is_integer(options['boundary_max_vertices'])
+            and options['boundary_max_vertices'] >= MIN_BOUNDARY_VERTICES):
+        raise ValueError(f'boundary_max_vertices must be an integer of at least {MIN_BOUNDARY_VERTICES}')
+    return options
+
+
+def parse_sweep_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
+    def as_list(value: Any) -> List[Any]:
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+    
+    options = {
+        'eps_km': as_list(params.get('eps_km', [5.0])),
+        'min_samples': as_list(params.get('min_samples', [3])),
+        'collapse_points': params.get('collapse_points', True),
+        'snap_decimals': params.get('snap_decimals'),
+        'use_cache': params.get('use_cache', True)
+    }
+    
+    if not options['eps_km'] or not options['min_samples']:
+        raise ValueError('eps_km and min_samples must list at least one value')
+    if not all(is_number(eps) and eps > 0 for eps in options['eps_km']):
+        raise ValueError('eps_km values must be positive numbers')
+    if not all(is_integer(min_samples) and min_samples >= 1 for min_samples in options['min_samples']):
+        raise ValueError('min_samples values must be integers of at least 1')
+    if len(set(options['eps_km'])) * len(set(options['min_samples'])) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f'A sweep is limited to {MAX_SWEEP_COMBINATIONS} combinations')
+    validate_snap_decimals(options['snap_decimals'])
+    return options
+
+
+def parse_window_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
+    options = {
+        'eps_km': params.get('eps_km', 5.0),
+        'min_samples': params.get('min_samples', 3),
+        'windows': params.get('windows', list(DEFAULT_TIME_WINDOWS)),
+        'step': params.get('step'),
+        'end': params.get('end'),
+        'max_steps': params.get('max_steps', 30),
+        'use_cache': params.get('use_cache', True)
+    }
+    
+    if not is_number(options['eps_km']) or options['eps_km'] <= 0:
+        raise ValueError('eps_km must be a positive number')
+    if not is_integer(options['min_samples']) or options['min_samples'] < 1:
+        raise ValueError('min_samples must be an integer of at least 1')
+    if isinstance(options['windows'], str):
+        options['windows'] = [options['windows']]
+    if not options['windows']:
+        raise ValueError('windows must list at least one window length')
+    for window in options['windows']:
+        parse_duration(window)
+    if options['step'] is not None:
+        parse_duration(options['step'])
+    if options['end'] is not None:
+        try:
+            pd.Timestamp(options['end'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid end time: {options['end']}")
+    if not (is_integer(options['max_steps']) and 1 <= options['max_steps'] <= MAX_WINDOW_STEPS):
+        raise ValueError(f'max_steps must be an integer between 1 and {MAX_WINDOW_STEPS}')
+    return options
+
+
+# Request latency per endpoint and time spent per pipeline stage, for /v1/metrics
+request_latency = Histogram('analytics_request_duration_seconds', "Request latency in seconds",
+                            ('endpoint', 'method', 'status'))
+stage_latency = Histogram('analytics_stage_duration_seconds', "Time spent in each analysis stage in seconds",
+                          ('stage',))
+
+
+def round_or_none(value: Optional[float], digits: int = 1) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def performance_metadata(processor: AnalyticsProcessor, started: float, results: Dict[str, Any],
+                         diagnostics: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Stage durations of the server-side steps plus those of the clustering task (none
+    # on a cache hit), the point count DBSCAN ran on after duplicate locations were
+    # collapsed, and peak RSS of the server process and of the clustering task
+    stage_seconds = dict(processor.stage_timings)
+    if diagnostics is not None:
+        for stage, seconds in diagnostics['stage_seconds'].items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+    for stage, seconds in stage_seconds.items():
+        stage_latency.observe(seconds, stage=stage)
+    
+    return {
+        'effective_points': results.get('summary', {}).get('effective_points'),
+        'stage_seconds': {stage: round(seconds, 6) for stage, seconds in stage_seconds.items()},
+        'duration_seconds': round(time.perf_counter() - started, 6),
+        'peak_memory_mb': {
+            'server': round_or_none(peak_rss_mb()),
+            'clustering': round_or_none(diagnostics['peak_rss_mb']) if diagnostics is not None else None
         }
-        
-        return results
+    }
+
+
+def pyramid_cache_key(analysis_key: str, max_zoom: int) -> str:
+    return 'pyramid:' + hashlib.sha256(f"{analysis_key}:{max_zoom}".encode()).hexdigest()
+
+
+def store_zoom_pyramid(analysis_key: str, pyramid: ZoomPyramid) -> Dict[str, Any]:
+    # Pyramids are always cached, whatever use_cache says, since the pyramid endpoint
+    # serves them from the cache; returns the response metadata pointing at it
+    key = pyramid_cache_key(analysis_key, pyramid.max_zoom)
+    result_cache.put(key, pyramid, pyramid.nbytes)
+    pyramid_id = key.split(':', 1)[1]
+    return {'id': pyramid_id, 'url': f"/v1/analyze/pyramid/{pyramid_id}", **pyramid.summary()}
+
+
+def load_reports(reports: Union[List[Dict], ReportColumns], options: Dict[str, Any],
+                 progress_callback: Optional[Callable[[str, str], None]] = None) -> AnalyticsProcessor:
+    # Loads and preprocesses the reports of a request in the server process, which
+    # is where its peak memory is measured from; the distance memory budget comes
+    # from ANALYTICS_MEMORY_BUDGET_MB
+    reset_peak_rss()
+    processor = AnalyticsProcessor(distance_dtype=options.get('distance_dtype', 'float64'))
+    processor.progress_callback = progress_callback
+    if isinstance(reports, ReportColumns):
+        processor.load_data_from_columns(reports)
+    else:
+        processor.load_data_from_json(reports)
+    processor.preprocess_data()
+    return processor
+
+
+def cached_task_results(processor: AnalyticsProcessor, options: Dict[str, Any], cache_key: str,
+                        task: Callable[..., Tuple[Dict[str, Any], Dict[str, Any]]],
+                        progress_callback: Optional[Callable[[str, str], None]] = None,
+                        background: bool = False, reuse: bool = True,
+                        size: Callable[[Any], int] = estimate_size_bytes
+                        ) -> Tuple[Any, Optional[Dict[str, Any]], bool]:
+    # Serves the task's results from the result cache, or runs it on the processor's
+    # data and caches what it returns when use_cache is set (reuse=False skips the
+    # lookup only); returns the results, the task's diagnostics (None on a cache hit)
+    # and whether the cache was hit
+    results = result_cache.get(cache_key) if options['use_cache'] and reuse else None
+    if results is not None:
+        return results, None, True
+    
+    results, diagnostics = run_clustering(processor.data, options, progress_callback,
+                                          background=background, task=task)
+    if options['use_cache']:
+        result_cache.put(cache_key, results, size(results))
+    return results, diagnostics, False
+
+
+def analysis_response(message: str, results: Dict[str, Any], total_reports: int, processor: AnalyticsProcessor,
+                      started: float, cache_key: str, cache_hit: bool, diagnostics: Optional[Dict[str, Any]],
+                      response_mode: Optional[str] = None, **extra_metadata: Any) -> Dict[str, Any]:
+    # Response body shared by the analysis endpoints
+    metadata = {
+        'total_reports_processed': total_reports,
+        'total_valid_coordinates': results['summary']['total_points']
+    }
+    if response_mode is not None:
+        metadata['response_mode'] = response_mode
+    metadata['cache'] = {'hit': cache_hit, 'key': cache_key}
+    metadata.update(performance_metadata(processor, started, results, diagnostics))
+    metadata.update(extra_metadata)
+    metadata['processing_time'] = datetime.now().isoformat()
+    return {
+        'success': True,
+        'message': message,
+        'results': results,
+        'metadata': metadata
+    }
+
+
+def execute_analysis(reports: Union[List[Dict], ReportColumns], options: Dict[str, Any],
+                     progress_callback: Optional[Callable[[str, str], None]] = None,
+                     background: bool = False) -> Dict[str, Any]:
+    # Full /v1/analyze pipeline, returning the response body
+    started = time.perf_counter()
+    processor = load_reports(reports, options, progress_callback)
+    
+    if options['clustering_mode'] == 'optics':
+        return execute_hierarchy_analysis(processor, len(reports), options, started, progress_callback, background)
+    
+    # Identical report sets and parameters are served from the result cache
+    cache_params = {
+        'eps_km': float(options['eps_km']),
+        'min_samples': int(options['min_samples']),
+        'neighbor_backend': options['neighbor_backend'],
+        'distance_dtype': options['distance_dtype'],
+        'response_mode': options['response_mode'],
+        'collapse_points': bool(options['collapse_points']),
+        'snap_decimals': options['snap_decimals'],
+        'cluster_boundaries': bool(options['cluster_boundaries']),
+        'boundary_max_vertices': options['boundary_max_vertices']
+    }
+    cache_columns = list(LEAN_RESPONSE_COLUMNS) if options['response_mode'] == 'lean' else None
+    cache_key = analysis_cache_key(processor.data, cache_params, cache_columns)
+    
+    # A pyramid evicted apart from its results is rebuilt by clustering again
+    pyramid = None
+    if options['zoom_pyramid'] and options['use_cache']:
+        pyramid = result_cache.get(pyramid_cache_key(cache_key, options['pyramid_max_zoom']))
+    results, diagnostics, cache_hit = cached_task_results(
+        processor, options, cache_key, cluster_report_data, progress_callback, background=background,
+        reuse=(pyramid is not None or not options['zoom_pyramid']))
+    if diagnostics is not None:
+        pyramid = diagnostics.pop('zoom_pyramid', None)
+    
+    extra_metadata = {}
+    if pyramid is not None:
+        extra_metadata['zoom_pyramid'] = store_zoom_pyramid(cache_key, pyramid)
+    
+    return analysis_response('Analysis completed successfully', results, len(reports), processor, started,
+                             cache_key, cache_hit, diagnostics, response_mode=options['response_mode'],
+                             **extra_metadata)
+
+
+def execute_hierarchy_analysis(processor: AnalyticsProcessor, total_reports: int, options: Dict[str, Any],
+                               started: float, progress_callback: Optional[Callable[[str, str], None]] = None,
+                               background: bool = False) -> Dict[str, Any]:
+    # The hierarchy depends on the reports, min_samples and max_eps_km but not on
+    # eps_km, so moving the radius slider re-cuts a cached hierarchy in the server
+    # process instead of clustering again
+    hierarchy_params = {
+        'hierarchy': 'optics',
+        'min_samples': int(options['min_samples']),
+        'max_eps_km': float(options['max_eps_km']),
+        'distance_dtype': options['distance_dtype'],
+        'collapse_points': bool(options['collapse_points']),
+        'snap_decimals': options['snap_decimals']
+    }
+    cache_key = analysis_cache_key(processor.data, hierarchy_params, [])
+    hierarchy, diagnostics, cache_hit = cached_task_results(
+        processor, options, cache_key, hierarchy_report_data, progress_callback, background=background,
+        size=lambda hierarchy: sum(value.nbytes for value in hierarchy.values() if isinstance(value, np.ndarray)))
+    
+    results = processor.cluster_from_hierarchy(hierarchy, options['eps_km'],
+                                               include_points=(options['response_mode'] == 'full'))
+    if options['cluster_boundaries']:
+        results['boundaries'] = processor.build_cluster_boundaries(options['boundary_max_vertices'])
+    
+    # Labels of a hierarchy cut are known here, so the pyramid is built in this process
+    extra_metadata = {}
+    if options['zoom_pyramid']:
+        cut_key = analysis_cache_key(processor.data, {**hierarchy_params, 'eps_km': float(options['eps_km'])}, [])
+        pyramid = result_cache.get(pyramid_cache_key(cut_key, options['pyramid_max_zoom']))
+        if pyramid is None:
+            pyramid = processor.build_zoom_pyramid(options['pyramid_max_zoom'])
+        extra_metadata['zoom_pyramid'] = store_zoom_pyramid(cut_key, pyramid)
+    
+    return analysis_response('Analysis completed successfully', results, total_reports, processor, started,
+                             cache_key, cache_hit, diagnostics, response_mode=options['response_mode'],
+                             **extra_metadata)
+
+
+def execute_windowed_analysis(reports: Union[List[Dict], ReportColumns], options: Dict[str, Any]) -> Dict[str, Any]:
+    # /v1/analyze/windows pipeline, returning the response body
+    started = time.perf_counter()
+    processor = load_reports(reports, options)
+    
+    cache_params = {
+        'windows': [str(window) for window in options['windows']],
+        'eps_km': float(options['eps_km']),
+        'min_samples': int(options['min_samples']),
+        'step': options['step'],
+        'end': options['end'],
+        'max_steps': int(options['max_steps'])
+    }
+    cache_key = analysis_cache_key(processor.data, cache_params, ['scannedAt'])
+    results, diagnostics, cache_hit = cached_task_results(processor, options, cache_key, windowed_report_data)
+    
+    return analysis_response('Windowed analysis completed successfully', results, len(reports), processor,
+                             started, cache_key, cache_hit, diagnostics)
+
+
+def execute_sweep(reports: Union[List[Dict], ReportColumns], options: Dict[str, Any]) -> Dict[str, Any]:
+    # /v1/analyze/sweep pipeline, returning the response body
+    started = time.perf_counter()
+    processor = load_reports(reports, options)
+    
+    cache_params = {
+        'sweep': True,
+        'eps_km': sorted({float(eps) for eps in options['eps_km']}),
+        'min_samples': sorted({int(min_samples) for min_samples in options['min_samples']}),
+        'collapse_points': bool(options['collapse_points']),
+        'snap_decimals': options['snap_decimals']
+    }
+    cache_key = analysis_cache_key(processor.data, cache_params, [])
+    results, diagnostics, cache_hit = cached_task_results(processor, options, cache_key, sweep_report_data)
+    
+    return analysis_response('Parameter sweep completed successfully', results, len(reports), processor,
+                             started, cache_key, cache_hit, diagnostics)
+
+
+# Background analysis jobs: status and results on local disk, run by a small thread
+# pool that hands clustering to the worker pool when one is configured
+JOB_WORKERS = int(os.environ.get('ANALYTICS_JOB_WORKERS', '2'))
+job_store = JobStore()
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='analysis-job')
+
+
+def run_analysis_job(job_id: str, reports: Union[List[Dict], ReportColumns], options: Dict[str, Any]) -> None:
+    progress = JobProgress(job_store.directory, job_id)
+    try:
+        body = execute_analysis(reports, options, progress_callback=progress, background=True)
+        job_store.save_result(job_id, body)
+    except ValueError as e:
+        job_store.fail(job_id, {'error': 'Validation error', 'message': str(e), 'status_code': 400})
+    except CancelledError:
+        job_store.fail(job_id, {'error': 'Cancelled', 'message': 'Server shut down', 'status_code': 503})
+    except ClusteringBusyError as e:
+        job_store.fail(job_id, {'error': 'Service busy', 'message': str(e), 'status_code': 503})
+    except Exception as e:
+        job_store.fail(job_id, {'error': 'Internal server error', 'message': str(e), 'status_code': 500})
+
+
+def shutdown_job_executor() -> None:
+    job_executor.shutdown(wait=False, cancel_futures=True)
 
 
 @app.route('/v1/health', methods=['GET'])
@@ -157,74 +848,353 @@ def health_check():
     })
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    # Labeled by route pattern, so job ids do not create a series each
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_latency.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method,
+                                status=response.status_code)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    # gzip or brotli per Accept-Encoding for JSON and text bodies of at least
+    # MIN_COMPRESS_BYTES; streamed bodies are compressed as they are sent. Registered
+    # after the latency hook so that compression time counts towards request latency.
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        response.response = iter_compress(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    elif response.content_length is not None and response.content_length >= MIN_COMPRESS_BYTES:
+        response.set_data(compress(response.get_data(), encoding))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def json_response(body: Dict[str, Any], stream: bool = False) -> Response:
+    # Streamed bodies are encoded piece by piece while they are sent, so a large
+    # result never exists as one string; they carry no Content-Length
+    if not stream:
+        return jsonify(body)
+    return Response(iter_json(body), mimetype='application/json')
+
+
+# Timeout titles of the endpoints that run clustering on the request thread's behalf
+TIMEOUT_ERRORS = {
+    'analyze_parameter_sweep': 'Sweep timed out',
+    'analyze_time_windows': 'Windowed analysis timed out'
+}
+
+
+@app.errorhandler(PayloadError)
+def handle_payload_error(e: PayloadError):
+    return jsonify({'error': str(e)}), e.status_code
+
+
+@app.errorhandler(ValueError)
+def handle_validation_error(e: ValueError):
+    return jsonify({
+        'success': False,
+        'error': 'Validation error',
+        'message': str(e)
+    }), 400
+
+
+@app.errorhandler(ClusteringBusyError)
+def handle_clustering_busy(e: ClusteringBusyError):
+    return jsonify({
+        'success': False,
+        'error': 'Service busy',
+        'message': str(e)
+    }), 503
+
+
+@app.errorhandler(ClusteringTimeoutError)
+def handle_clustering_timeout(e: ClusteringTimeoutError):
+    return jsonify({
+        'success': False,
+        'error': TIMEOUT_ERRORS.get(request.endpoint, 'Analysis timed out'),
+        'message': str(e)
+    }), 504
+
+
+@app.errorhandler(Exception)
+def handle_internal_error(e: Exception):
+    # HTTP errors (404, 405, ...) keep werkzeug's responses
+    if isinstance(e, HTTPException):
+        return e
+    return jsonify({
+        'success': False,
+        'error': 'Internal server error',
+        'message': str(e)
+    }), 500
+
+
+@app.route('/v1/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text format: latency histograms, result cache use and clustering
+    # pool load (all zero without a pool under the development server)
+    cache = result_cache.stats()
+    lookups = cache['hits'] + cache['misses']
+    lines = request_latency.render() + stage_latency.render()
+    lines += format_gauge('analytics_cache_hits_total', "Result cache hits", cache['hits'], kind='counter')
+    lines += format_gauge('analytics_cache_misses_total', "Result cache misses", cache['misses'], kind='counter')
+    lines += format_gauge('analytics_cache_hit_ratio', "Share of result cache lookups that hit",
+                          cache['hits'] / lookups if lookups else 0.0)
+    lines += format_gauge('analytics_cache_entries', "Entries in the result cache", cache['entries'])
+    lines += format_gauge('analytics_cache_bytes', "Estimated size of the cached results", cache['bytes'])
+    lines += format_gauge('analytics_cache_max_bytes', "Result cache size limit", cache['max_bytes'])
+    
+    models = incremental_models.stats()
+    lines += format_gauge('analytics_incremental_models', "Incremental clustering models held", models['entries'])
+    lines += format_gauge('analytics_incremental_bytes', "Estimated size of the incremental models", models['bytes'])
+    
+    pool = clustering_pool
+    lines += format_gauge('analytics_pool_workers', "Clustering worker processes",
+                          pool.max_workers if pool is not None else 0)
+    lines += format_gauge('analytics_pool_in_flight', "Clustering jobs running or waiting for a worker",
+                          pool.in_flight if pool is not None else 0)
+    lines += format_gauge('analytics_pool_queue_depth', "Clustering jobs waiting for a free worker",
+                          pool.queue_depth if pool is not None else 0)
+    
+    return Response('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/v1/analyze', methods=['POST'])
 def analyze_scan_reports():
+    # Validate request and read reports (JSON object, JSON array or NDJSON)
+    reports, params = read_analysis_request()
+    
+    # Get and validate clustering parameters
+    options = parse_analysis_parameters(params)
+    
+    return json_response(execute_analysis(reports, options), stream=options['stream_response'])
+
+
+@app.route('/v1/analyze/sweep', methods=['POST'])
+def analyze_parameter_sweep():
+    # Same bodies as /v1/analyze; eps_km and min_samples are lists of values
+    reports, params = read_analysis_request(SWEEP_QUERY_PARAMETER_TYPES)
+    options = parse_sweep_parameters(params)
+    
+    return jsonify(execute_sweep(reports, options))
+
+
+@app.route('/v1/analyze/windows', methods=['POST'])
+def analyze_time_windows():
+    # Same bodies as /v1/analyze; windows lists rolling window lengths over scannedAt
+    reports, params = read_analysis_request(WINDOW_QUERY_PARAMETER_TYPES)
+    options = parse_window_parameters(params)
+    
+    return jsonify(execute_windowed_analysis(reports, options))
+
+
+@app.route('/v1/analyze/jobs', methods=['POST'])
+def create_analysis_job():
+    reports, params = read_analysis_request()
+    options = parse_analysis_parameters(params)
+    
+    job = job_store.create(options)
+    job_executor.submit(run_analysis_job, job['job_id'], reports, options)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Analysis job accepted',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/v1/analyze/jobs/{job['job_id']}",
+        'result_url': f"/v1/analyze/jobs/{job['job_id']}/result"
+    }), 202
+
+
+@app.route('/v1/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id: str):
     try:
-        # Validate request
-        if not request.is_json:
-            return jsonify({'error': 'Request must be JSON'}), 400
-        
-        data = request.get_json()
-        
-        # Validate required fields
-        if 'reports' not in data or not isinstance(data['reports'], list):
-            return jsonify({'error': 'Missing or invalid "reports" field'}), 400
-        
-        if len(data['reports']) == 0:
-            return jsonify({'error': 'Reports array cannot be empty'}), 400
-        
-        # Get clustering parameters
-        params = data.get('parameters', {})
-        eps_km = params.get('eps_km', 5.0)
-        min_samples = params.get('min_samples', 3)
-        
-        # Validate parameters
-        if eps_km <= 0:
-            return jsonify({'error': 'eps_km must be positive'}), 400
-        if min_samples < 1:
-            return jsonify({'error': 'min_samples must be at least 1'}), 400
-        
-        # Initialize processor
-        processor = AnalyticsProcessor()
-        
-        # Load and process data
-        processor.load_data_from_json(data['reports'])
-        processor.preprocess_data()
-        
-        # Run clustering
-        results = processor.dbscan_clustering(eps_km=eps_km, min_samples=min_samples)
-        
-        # Return results
-        return jsonify({
-            'success': True,
-            'message': 'Analysis completed successfully',
-            'results': results,
-            'metadata': {
-                'total_reports_processed': len(data['reports']),
-                'total_valid_coordinates': results['summary']['total_points'],
-                'processing_time': datetime.now().isoformat()
-            }
-        })
-        
-    except ValueError as e:
+        job = job_store.get(job_id)
+    except ValueError:
+        job = None
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job})
+
+
+@app.route('/v1/analyze/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id: str):
+    try:
+        job = job_store.get(job_id)
+    except ValueError:
+        job = None
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    if job['status'] == 'failed':
+        error = job['error'] or {}
         return jsonify({
             'success': False,
-            'error': 'Validation error',
-            'message': str(e)
-        }), 400
+            'error': error.get('error', 'Internal server error'),
+            'message': error.get('message', '')
+        }), error.get('status_code', 500)
+    
+    body = job_store.load_result(job_id) if job['status'] == 'completed' else None
+    if body is None:
+        # Not finished yet; the caller polls again
+        return jsonify({'success': True, 'job': job}), 202
+    
+    return json_response(body, stream=job['parameters'].get('stream_response', False))
+
+
+@app.route('/v1/analyze/pyramid/<pyramid_id>', methods=['GET'])
+def query_zoom_pyramid(pyramid_id: str):
+    # Aggregates of a pyramid built by /v1/analyze with zoom_pyramid=true that fall
+    # inside ?bbox=west,south,east,north at ?zoom=
+    pyramid = result_cache.get('pyramid:' + pyramid_id)
+    if not isinstance(pyramid, ZoomPyramid):
+        return jsonify({'success': False, 'error': 'Pyramid not found',
+                        'message': 'Unknown or expired pyramid id; run the analysis again'}), 404
+    
+    try:
+        west, south, east, north = (float(value) for value in request.args['bbox'].split(','))
+        zoom = float(request.args['zoom'])
+        limit = int(request.args.get('limit', MAX_PYRAMID_FEATURES))
+    except KeyError as e:
+        raise ValueError(f"Missing query parameter: {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be west,south,east,north in degrees and zoom a number")
+    if not (np.isfinite([west, south, east, north, zoom]).all() and south <= north and zoom >= 0):
+        raise ValueError("bbox must be west,south,east,north with south <= north, and zoom >= 0")
+    if not 1 <= limit <= MAX_PYRAMID_FEATURES:
+        raise ValueError(f"limit must be between 1 and {MAX_PYRAMID_FEATURES}")
+    
+    return jsonify({
+        'success': True,
+        'pyramid_id': pyramid_id,
+        'bbox': [west, south, east, north],
+        **pyramid.query(west, south, east, north, zoom, limit)
+    })
+
+
+@app.route('/v1/analyze/incremental', methods=['POST'])
+def analyze_incremental():
+    if not request.is_json:
+        return jsonify({'error': 'Request must be JSON'}), 400
+    
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    dataset_id = data.get('dataset_id')
+    if not isinstance(dataset_id, str) or not dataset_id:
+        return jsonify({'error': 'Missing or invalid "dataset_id" field'}), 400
+    if 'reports' not in data or not isinstance(data['reports'], list):
+        return jsonify({'error': 'Missing or invalid "reports" field'}), 400
+    
+    params = data.get('parameters', {})
+    if not isinstance(params, dict):
+        raise ValueError('parameters must be a JSON object')
+    eps_km = params.get('eps_km', 5.0)
+    min_samples = params.get('min_samples', 3)
+    if not is_number(eps_km) or eps_km <= 0:
+        raise ValueError('eps_km must be a positive number')
+    if not is_integer(min_samples) or min_samples < 1:
+        raise ValueError('min_samples must be an integer of at least 1')
+    
+    processor = AnalyticsProcessor()
+    if data['reports']:
+        processor.load_data_from_json(data['reports'])
+        batch = processor.data
+    else:
+        batch = pd.DataFrame({'latitude': [], 'longitude': []})
+    
+    # Reuse the dataset's model unless the caller resets it; parameters cannot
+    # change under an existing model since its core points depend on them. Updates
+    # of one dataset run one at a time; a model replaced while waiting (by a reset
+    # or an eviction) is looked up again. Inserts run here rather than in the
+    # clustering pool: they cost O(batch neighborhoods), while shipping the model to
+    # a worker would cost O(history) on every call.
+    while True:
+        with incremental_models_lock:
+            model = incremental_models.get(dataset_id)
+            created = model is None or bool(data.get('reset', False))
+            if created:
+                model = IncrementalDBSCAN(eps_km=eps_km, min_samples=min_samples)
+                incremental_models.put(dataset_id, model, model.nbytes)
+            elif (model.eps_km, model.min_samples) != (eps_km, min_samples):
+                raise ValueError("Parameters differ from the existing model for this dataset_id; "
+                                 "send reset=true to re-cluster")
         
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error',
-            'message': str(e)
-        }), 500
+        with model.lock:
+            if not created and incremental_models.get(dataset_id) is not model:
+                continue
+            if model.nbytes + len(batch) * PYTHON_BYTES_PER_POINT > incremental_models.max_bytes:
+                raise PayloadError('Dataset exceeds the incremental model size limit; '
+                                   'send reset=true to start over', 413)
+            ids = batch['_id'].tolist() if '_id' in batch.columns else None
+            changed = model.insert(batch['latitude'].values, batch['longitude'].values, ids=ids)
+            indices = sorted(changed)
+            results = {
+                'summary': model.summary(),
+                'changed_labels': {
+                    'index': indices,
+                    '_id': [model.ids[index] for index in indices],
+                    'cluster': [changed[index] for index in indices]
+                }
+            }
+            incremental_models.put(dataset_id, model, model.nbytes)
+        break
+    
+    return jsonify({
+        'success': True,
+        'message': 'Incremental update completed successfully',
+        'results': {
+            'clustering_params': {
+                'eps_km': eps_km,
+                'min_samples': min_samples
+            },
+            **results,
+            'timestamp': datetime.now().isoformat()
+        },
+        'metadata': {
+            'dataset_id': dataset_id,
+            'model_created': created,
+            'total_reports_processed': len(data['reports']),
+            'total_valid_coordinates': len(batch),
+            'processing_time': datetime.now().isoformat()
+        }
+    })
 
 
 if __name__ == '__main__':
     print("🚀 Starting DBSCAN Geospatial Analytics API...")
     print("📡 Endpoints available:")
     print("  POST /v1/analyze - Main clustering endpoint")
+    print("  POST /v1/analyze/sweep - Summaries for a grid of eps_km/min_samples values")
+    print("  POST /v1/analyze/windows - Hotspots for rolling scannedAt windows")
+    print("  POST /v1/analyze/jobs - Start a background analysis job")
+    print("  GET /v1/analyze/jobs/<job_id> - Job status and stage progress")
+    print("  GET /v1/analyze/jobs/<job_id>/result - Job result")
+    print("  GET /v1/analyze/pyramid/<pyramid_id>?bbox=&zoom= - Map aggregates for a view")
+    print("  POST /v1/analyze/incremental - Append reports to a persistent clustering")
+    print("  GET /v1/metrics - Latency, cache and worker pool metrics (Prometheus format)")
     print("  GET /v1/health - Health check")
+    print("ℹ️  Development server only; use serve.py for production")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from metrics import peak_rss_mb
+from workload import WORKLOADS, generate_workload, generate_uniform_workload
+
+# Pipeline stages in run order. load..stats are timed by AnalyticsProcessor itself;
+# serialize is the JSON encoding of the full response and map the folium rendering.
+# Stages a run does not reach (e.g. neighbors under the partitioned backend) are 0.
+STAGES = ('load', 'preprocess', 'collapse', 'neighbors', 'cluster', 'stats', 'serialize', 'map')
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# A metric only counts as a regression when it is both `tolerance` times slower than
+# the baseline and slower by more than these absolute amounts, so that millisecond
+# stages and allocator noise do not trip the check
+MIN_REGRESSION_SECONDS = 0.05
+MIN_REGRESSION_MB = 16.0
+
+
+def run_pipeline(n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    # One full analysis of n reports, run in a fresh process so that its peak RSS
+    # belongs to this size alone
+    import api
+    from engine import AnalyticsProcessor
+
+    generate = generate_workload if options['workload'] == 'realistic' else generate_uniform_workload
+    reports = generate(n, options['seed'])
+    rss_before = peak_rss_mb()
+
+    processor = AnalyticsProcessor()
+    processor.load_data_from_json(reports)
+    del reports
+    processor.preprocess_data()
+    results = processor.dbscan_clustering(eps_km=options['eps_km'], min_samples=options['min_samples'],
+                                          neighbor_backend=options['neighbor_backend'])
+
+    with processor.stage('serialize'):
+        body = api.app.json.dumps(results)
+
+    # The map is drawn in create_visualization_map's 'auto' mode; sizes above
+    # map_max_reports skip it
+    map_rendered = n <= options['map_max_reports']
+    if map_rendered:
+        with tempfile.TemporaryDirectory() as directory, processor.stage('map'):
+            processor.create_visualization_map(os.path.join(directory, 'clusters_map.html'))
+
+    stages = {name: round(processor.stage_timings.get(name, 0.0), 4) for name in STAGES}
+    peak = peak_rss_mb()
+    return {
+        'reports': n,
+        'stages': stages,
+        'total_seconds': round(sum(stages.values()), 4),
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+        'input_rss_mb': round(rss_before, 1) if rss_before is not None else None,
+        'response_bytes': len(body),
+        'map_rendered': map_rendered,
+        'neighbor_backend': results['clustering_params']['neighbor_backend'],
+        'summary': results['summary']
+    }
+
+
+def benchmark_size(n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    # Best time per stage over the repeats; peak memory is the highest seen
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(options['repeat']):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                runs.append(executor.submit(run_pipeline, n, options).result())
+            except BrokenProcessPool:
+                # Usually the kernel's OOM killer; the size is reported as failed
+                return {'reports': n, 'error': "Benchmark process terminated abruptly (out of memory?)"}
+            except Exception as e:
+                return {'reports': n, 'error': f"{type(e).__name__}: {e}"}
+
+    result = dict(runs[0])
+    result['stages'] = {name: min(run['stages'][name] for run in runs) for name in STAGES}
+    result['total_seconds'] = min(run['total_seconds'] for run in runs)
+    if result['peak_rss_mb'] is not None:
+        result['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    result['repeat'] = len(runs)
+    return result
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+                     tolerance: float) -> List[Dict[str, Any]]:
+    # Metrics of sizes present in both runs that got worse by more than tolerance
+    baseline_by_size = {entry['reports']: entry for entry in baseline.get('results', [])}
+    regressions = []
+
+    def check(n: int, metric: str, previous: Optional[float], current: Optional[float], min_delta: float) -> None:
+        if previous is None or current is None:
+            return
+        if current > previous * (1 + tolerance) and current - previous > min_delta:
+            regressions.append({
+                'reports': n,
+                'metric': metric,
+                'baseline': previous,
+                'current': current,
+                'ratio': round(current / previous, 2) if previous else None
+            })
+
+    for entry in results:
+        previous = baseline_by_size.get(entry['reports'])
+        if previous is None or 'error' in previous:
+            continue
+        if 'error' in entry:
+            regressions.append({'reports': entry['reports'], 'metric': 'error', 'baseline': None,
+                                'current': entry['error'], 'ratio': None})
+            continue
+        for name in STAGES:
+            check(entry['reports'], name, previous['stages'].get(name), entry['stages'][name], MIN_REGRESSION_SECONDS)
+        check(entry['reports'], 'total_seconds', previous.get('total_seconds'), entry['total_seconds'],
+              MIN_REGRESSION_SECONDS)
+        check(entry['reports'], 'peak_rss_mb', previous.get('peak_rss_mb'), entry['peak_rss_mb'], MIN_REGRESSION_MB)
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the DBSCAN analytics pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Report counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per size; the fastest time per stage is kept")
+    parser.add_argument('--workload', choices=WORKLOADS, default='realistic',
+                        help="realistic: store hotspots, kiosk duplicates, bursts and malformed "
+                             "coordinates (see workload.py); uniform: random points over Metro Manila")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--eps-km', type=float, default=0.2)
+    parser.add_argument('--min-samples', type=int, default=5)
+    parser.add_argument('--neighbor-backend', default='auto')
+    parser.add_argument('--map-max-reports', type=int, default=max(DEFAULT_SIZES),
+                        help="Largest size for which the folium map is rendered")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results")
+    parser.add_argument('--baseline', help="Results file of an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown or memory growth over the baseline (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Overwrite the baseline file with this run's results")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    options = {
+        'workload': args.workload,
+        'seed': args.seed,
+        'eps_km': args.eps_km,
+        'min_samples': args.min_samples,
+        'neighbor_backend': args.neighbor_backend,
+        'map_max_reports': args.map_max_reports,
+        'repeat': max(1, args.repeat)
+    }
+
+    print(f"{'reports':>10} " + ' '.join(f"{name:>10}" for name in STAGES) + f" {'total':>10} {'peak MB':>10}")
+    results = []
+    for n in args.sizes:
+        entry = benchmark_size(n, options)
+        results.append(entry)
+        if 'error' in entry:
+            print(f"{n:>10} ❌ {entry['error']}")
+            continue
+        peak = entry['peak_rss_mb']
+        print(f"{n:>10} " + ' '.join(f"{entry['stages'][name]:>10.3f}" for name in STAGES)
+              + f" {entry['total_seconds']:>10.3f} {peak if peak is not None else '-':>10}")
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__
+        },
+        'options': options,
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            report['baseline'] = args.baseline
+            report['regressions'] = find_regressions(results, baseline, args.tolerance)
+            for regression in report['regressions']:
+                print(f"⚠️  Regression at {regression['reports']} reports: {regression['metric']} "
+                      f"{regression['baseline']} -> {regression['current']}")
+            if report['regressions']:
+                exit_code = 1
+            else:
+                print(f"✓ No regressions against {args.baseline}")
+        elif not args.update_baseline:
+            print(f"❌ Baseline file not found: {args.baseline}")
+            exit_code = 2
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline updated: {args.baseline}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
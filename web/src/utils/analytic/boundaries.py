@@ -0,0 +1,150 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+KM_PER_DEGREE = 111.32
+
+# Extreme points of every cluster are taken in this many directions; members strictly
+# inside the polygon they span cannot be hull vertices and are dropped before the
+# exact hull is built, which leaves a few dozen candidates even for huge clusters
+HULL_DIRECTIONS = 16
+
+# Clusters without a proper hull (collinear members, or a single location) are
+# outlined by a circle of the cluster radius, at least MIN_OUTLINE_KM
+CIRCLE_VERTICES = 24
+MIN_OUTLINE_KM = 0.05
+
+# Smallest vertex budget a simplified outline can have (a triangle)
+MIN_BOUNDARY_VERTICES = 3
+
+# Decimals kept in the GeoJSON coordinates (~0.1 m)
+COORDINATE_DECIMALS = 6
+
+
+def convex_hull(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Indices of the hull vertices in counter-clockwise order (Andrew's monotone
+    # chain); fewer than 3 when the points are collinear or coincide
+    order = np.lexsort((y, x))
+    xs, ys = x[order].tolist(), y[order].tolist()
+
+    def chain(indices) -> List[int]:
+        hull: List[int] = []
+        for i in indices:
+            while len(hull) >= 2:
+                a, b = hull[-2], hull[-1]
+                if (xs[b] - xs[a]) * (ys[i] - ys[a]) - (ys[b] - ys[a]) * (xs[i] - xs[a]) > 0:
+                    break
+                hull.pop()
+            hull.append(i)
+        return hull
+
+    lower = chain(range(len(xs)))
+    upper = chain(reversed(range(len(xs))))
+    hull = lower[:-1] + upper[:-1]
+    if len(hull) < 3:
+        return np.empty(0, dtype=np.int64)
+    return order[hull]
+
+
+def simplify_ring(x: np.ndarray, y: np.ndarray, max_vertices: int) -> np.ndarray:
+    # Visvalingam-Whyatt on a closed ring: drops the vertex spanning the smallest
+    # triangle with its neighbors until max_vertices remain; returns kept indices
+    keep = np.arange(len(x))
+    while len(keep) > max_vertices:
+        px, py = x[keep], y[keep]
+        prev_x, prev_y = np.roll(px, 1), np.roll(py, 1)
+        next_x, next_y = np.roll(px, -1), np.roll(py, -1)
+        areas = np.abs((px - prev_x) * (next_y - prev_y) - (next_x - prev_x) * (py - prev_y))
+        keep = np.delete(keep, np.argmin(areas))
+    return keep
+
+
+def circle(radius_km: float, vertices: int) -> np.ndarray:
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    return np.column_stack([np.cos(angles), np.sin(angles)]) * radius_km
+
+
+def cluster_boundaries(latitudes: np.ndarray, longitudes: np.ndarray, labels: np.ndarray,
+                       max_vertices: Optional[int] = None) -> Dict[str, Any]:
+    # Outline of every cluster as a GeoJSON FeatureCollection of Polygons, largest
+    # cluster first. Hulls are built in a local equirectangular projection (km) around
+    # each cluster's centroid, so simplification and the fallback circles are measured
+    # in distance rather than degrees. With max_vertices, outlines with more vertices
+    # are simplified down to that many (keeping a subset of the hull vertices).
+    labels = np.asarray(labels)
+    clustered = np.flatnonzero(labels >= 0)
+    if len(clustered) == 0:
+        return {'type': 'FeatureCollection', 'features': []}
+
+    # Members of each cluster as contiguous runs of one stable sort
+    order = clustered[np.argsort(labels[clustered], kind='stable')]
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    cluster_ids = sorted_labels[starts]
+    sizes = np.diff(np.r_[starts, len(order)])
+    group = np.repeat(np.arange(len(starts)), sizes)
+
+    lat = np.asarray(latitudes, dtype=np.float64)[order]
+    lng = np.asarray(longitudes, dtype=np.float64)[order]
+    center_lat = np.add.reduceat(lat, starts) / sizes
+    center_lng = np.add.reduceat(lng, starts) / sizes
+    km_per_lng = KM_PER_DEGREE * np.cos(np.radians(center_lat))
+    x = (lng - center_lng[group]) * km_per_lng[group]
+    y = (lat - center_lat[group]) * KM_PER_DEGREE
+    radius = np.sqrt(np.maximum.reduceat(x * x + y * y, starts))
+
+    # First member reaching the maximum projection in each direction, for all clusters
+    # at once; in order of increasing angle these run counter-clockwise around the hull
+    positions = np.arange(len(order))
+    extremes = np.empty((len(starts), HULL_DIRECTIONS), dtype=np.int64)
+    for k, angle in enumerate(np.linspace(0, 2 * np.pi, HULL_DIRECTIONS, endpoint=False)):
+        projection = x * np.cos(angle) + y * np.sin(angle)
+        reached = projection >= np.maximum.reduceat(projection, starts)[group]
+        extremes[:, k] = np.minimum.reduceat(np.where(reached, positions, len(order)), starts)
+
+    # Members strictly left of every edge of that polygon are interior; edges between
+    # equal extremes say nothing
+    interior = np.ones(len(order), dtype=bool)
+    for k in range(HULL_DIRECTIONS):
+        a, b = extremes[:, k], extremes[:, (k + 1) % HULL_DIRECTIONS]
+        edge_x, edge_y = x[b] - x[a], y[b] - y[a]
+        cross = edge_x[group] * (y - y[a][group]) - edge_y[group] * (x - x[a][group])
+        interior &= (cross > 0) | ((edge_x == 0) & (edge_y == 0))[group]
+    candidate = ~interior
+    candidate[extremes.ravel()] = True
+    candidates = np.flatnonzero(candidate)
+    bounds = np.searchsorted(group[candidates], np.arange(len(starts) + 1))
+
+    features = []
+    for k in np.argsort(-sizes, kind='stable').tolist():
+        members = candidates[bounds[k]:bounds[k + 1]]
+        hull = members[convex_hull(x[members], y[members])]
+        if len(hull):
+            ring = np.column_stack([x[hull], y[hull]])
+            outline = 'hull'
+        else:
+            vertices = CIRCLE_VERTICES if max_vertices is None else min(CIRCLE_VERTICES, max_vertices)
+            ring = circle(max(float(radius[k]), MIN_OUTLINE_KM), vertices)
+            outline = 'circle'
+
+        simplified = max_vertices is not None and len(ring) > max_vertices
+        if simplified:
+            ring = ring[simplify_ring(ring[:, 0], ring[:, 1], max_vertices)]
+        area = 0.5 * abs(np.dot(ring[:, 0], np.roll(ring[:, 1], -1)) - np.dot(ring[:, 1], np.roll(ring[:, 0], -1)))
+
+        coordinates = np.round(np.column_stack([center_lng[k] + ring[:, 0] / km_per_lng[k],
+                                                center_lat[k] + ring[:, 1] / KM_PER_DEGREE]),
+                               COORDINATE_DECIMALS).tolist()
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Polygon', 'coordinates': [coordinates + coordinates[:1]]},
+            'properties': {
+                'cluster_id': int(cluster_ids[k]),
+                'size': int(sizes[k]),
+                'outline': outline,
+                'vertices': len(coordinates),
+                'simplified': simplified,
+                'area_km2': round(float(area), 6)
+            }
+        })
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from geodesy import haversine_km
+
+EPS_KM = 0.5
+MIN_SAMPLES = 5
+
+
+@pytest.fixture(scope='session')
+def coordinates() -> np.ndarray:
+    # Three blobs of a few km around Manila, scattered noise, and every fifth report
+    # repeated at the same location (kiosks report many times from one place)
+    rng = np.random.default_rng(7)
+    centers = np.array([[14.60, 120.98], [14.65, 121.03], [14.55, 121.05]])
+    blobs = np.concatenate([center + rng.normal(0, 0.006, (150, 2)) for center in centers])
+    noise = np.column_stack([rng.uniform(14.45, 14.75, 150), rng.uniform(120.90, 121.15, 150)])
+    points = np.concatenate([blobs, noise])
+    points = np.concatenate([points, points[::5]])
+    return points[rng.permutation(len(points))]
+
+
+def reference_dbscan(coordinates: np.ndarray, eps_km: float = EPS_KM, min_samples: int = MIN_SAMPLES) -> DBSCAN:
+    # The labels every backend is held to: DBSCAN over precomputed haversine distances
+    lat, lon = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    distances = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    return DBSCAN(eps=eps_km, min_samples=min_samples, metric='precomputed').fit(distances)
+
+
+def core_mask(model: DBSCAN) -> np.ndarray:
+    mask = np.zeros(len(model.labels_), dtype=bool)
+    mask[model.core_sample_indices_] = True
+    return mask
+
+
+def assert_same_partition(labels: np.ndarray, expected: np.ndarray) -> None:
+    # Equal up to renumbering: noise matches and labels map one to one
+    labels, expected = np.asarray(labels), np.asarray(expected)
+    np.testing.assert_array_equal(labels == -1, expected == -1)
+    pairs = np.unique(np.column_stack([labels, expected])[expected >= 0], axis=0)
+    assert len(np.unique(pairs[:, 0])) == len(pairs) == len(np.unique(pairs[:, 1]))
+
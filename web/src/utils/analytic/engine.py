@@ -0,0 +1,849 @@
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from math import radians, cos, sin, asin, sqrt
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from schema import decode_reports
+from ingest import ReportColumns
+from pyramid import ZoomPyramid, PYRAMID_MAX_ZOOM
+from boundaries import cluster_boundaries
+from geodesy import EARTH_RADIUS_KM, haversine_km
+
+if TYPE_CHECKING:
+    import folium
+
+# The clustering backends (scikit-learn, and the partitioned, hierarchy and window
+# modules built on it) and folium load on first use inside the methods that need them,
+# so importing the engine, e.g. for an API process that only serves cached results,
+# stays cheap
+
+# Upper bound on matrix cells evaluated per vectorized block (~16 MB of float64)
+DISTANCE_BLOCK_ELEMENTS = 2_000_000
+
+# Float64 temporaries the haversine kernel holds per block cell
+DISTANCE_BLOCK_TEMPORARIES = 4
+
+# Storage types allowed for precomputed distances
+DISTANCE_DTYPES = ('float64', 'float32')
+
+# Neighbor backends for dbscan_clustering; 'auto' switches to the sparse graph above this
+# size, 'partitioned' clusters lat/lng grid cells in a process pool
+NEIGHBOR_BACKENDS = ('auto', 'dense', 'graph', 'partitioned')
+DENSE_MAX_POINTS = 5000
+
+# Map rendering modes for create_visualization_map; 'auto' draws individual markers
+# up to MAP_MARKER_MAX_POINTS reports and per-cluster outlines above
+MAP_MODES = ('auto', 'markers', 'clusters', 'marker_cluster')
+MAP_MARKER_MAX_POINTS = 2000
+
+# Noise is binned into grid cells of this size (degrees, ~1 km), coarsened until at
+# most MAP_NOISE_MAX_CELLS cells are drawn
+MAP_NOISE_CELL_DEGREES = 0.01
+MAP_NOISE_MAX_CELLS = 2000
+
+
+def default_memory_budget_mb() -> float:
+    # ANALYTICS_MEMORY_BUDGET_MB wins; otherwise allow half of physical memory
+    configured = os.environ.get('ANALYTICS_MEMORY_BUDGET_MB')
+    if configured:
+        return float(configured)
+    try:
+        total_bytes = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        return total_bytes / 2 / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return 1024.0
+
+
+class AnalyticsProcessor:
+    
+    def __init__(self, memory_budget_mb: Optional[float] = None, distance_dtype: str = 'float64',
+                 spill_dir: Optional[str] = None):
+        if distance_dtype not in DISTANCE_DTYPES:
+            raise ValueError(f"distance_dtype must be one of: {list(DISTANCE_DTYPES)}")
+        
+        self.data = None
+        self.clusters = None
+        self.cluster_statistics = {}
+        
+        # Optional callable(stage, state) notified as pipeline stages start and finish,
+        # and the wall time spent in each stage
+        self.progress_callback: Optional[Callable[[str, str], None]] = None
+        self.stage_timings: Dict[str, float] = {}
+        
+        # Distance computation limits: RAM budget, storage precision and where
+        # matrices larger than the budget are memory-mapped
+        self.memory_budget_mb = memory_budget_mb if memory_budget_mb is not None else default_memory_budget_mb()
+        self.distance_dtype = np.dtype(distance_dtype)
+        self.spill_dir = spill_dir or os.environ.get('ANALYTICS_SPILL_DIR')
+        
+    @contextmanager
+    def stage(self, name: str):
+        if self.progress_callback is not None:
+            self.progress_callback(name, 'running')
+        started = time.perf_counter()
+        yield
+        self.stage_timings[name] = self.stage_timings.get(name, 0.0) + time.perf_counter() - started
+        if self.progress_callback is not None:
+            self.progress_callback(name, 'completed')
+    
+    def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        # Convert decimal degrees to radians
+        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+        
+        # Haversine formula
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+        c = 2 * asin(sqrt(a))
+        
+        return c * EARTH_RADIUS_KM
+    
+    def haversine_vectorized(self, lat1: np.ndarray, lon1: np.ndarray,
+                             lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+        # Same formula as haversine_distance, on radian arrays that broadcast together
+        return haversine_km(lat1, lon1, lat2, lon2)
+    
+    def allocate_distance_matrix(self, n: int) -> np.ndarray:
+        # Matrices that fit the budget live in RAM; larger ones spill to an anonymous
+        # temporary file that is mapped into memory and removed once released
+        matrix_bytes = n * n * self.distance_dtype.itemsize
+        if matrix_bytes <= self.memory_budget_mb * 1024 * 1024:
+            return np.zeros((n, n), dtype=self.distance_dtype)
+        
+        with tempfile.TemporaryFile(dir=self.spill_dir) as spill_file:
+            return np.memmap(spill_file, dtype=self.distance_dtype, mode='w+', shape=(n, n))
+    
+    def distance_block_rows(self, n: int) -> int:
+        # Rows per tile so the kernel's temporaries stay within the memory budget
+        # (less whatever the in-RAM matrix itself occupies)
+        budget_bytes = self.memory_budget_mb * 1024 * 1024
+        matrix_bytes = n * n * self.distance_dtype.itemsize
+        if matrix_bytes <= budget_bytes:
+            budget_bytes -= matrix_bytes
+        
+        block_elements = min(DISTANCE_BLOCK_ELEMENTS, budget_bytes // (DISTANCE_BLOCK_TEMPORARIES * 8))
+        return int(max(1, block_elements // n))
+    
+    def calculate_distance_matrix(self, coordinates: np.ndarray) -> np.ndarray:
+        n = len(coordinates)
+        distance_matrix = self.allocate_distance_matrix(n)
+        if n == 0:
+            return distance_matrix
+        
+        coords_rad = np.radians(np.asarray(coordinates, dtype=np.float64))
+        lat = coords_rad[:, 0]
+        lon = coords_rad[:, 1]
+        
+        # Each block of rows is computed against the columns from its first row onward
+        # and mirrored, so every pair is evaluated once
+        block_rows = self.distance_block_rows(n)
+        for start in range(0, n, block_rows):
+            stop = min(start + block_rows, n)
+            block = self.haversine_vectorized(lat[start:stop, None], lon[start:stop, None],
+                                              lat[None, start:], lon[None, start:])
+            block = block.astype(self.distance_dtype, copy=False)
+            distance_matrix[start:stop, start:] = block
+            distance_matrix[start:, start:stop] = block.T
+        
+        np.fill_diagonal(distance_matrix, 0.0)
+        return distance_matrix
+    
+    def calculate_neighbor_graph(self, coordinates: np.ndarray, eps_km: float) -> sparse.csr_matrix:
+        from sklearn.neighbors import BallTree
+        
+        n = len(coordinates)
+        if n == 0:
+            return sparse.csr_matrix((0, 0))
+        
+        coords_rad = np.radians(np.asarray(coordinates, dtype=np.float64))
+        lat = coords_rad[:, 0]
+        lon = coords_rad[:, 1]
+        
+        # BallTree only prefilters candidates at a slightly inflated radius; the stored
+        # distances come from the same kernel as the dense matrix, and DBSCAN applies
+        # the exact eps cut, so both backends agree on points sitting right at eps
+        tree = BallTree(coords_rad, metric='haversine')
+        neighbors = tree.query_radius(coords_rad, r=(eps_km / EARTH_RADIUS_KM) * (1 + 1e-9))
+        
+        counts = np.fromiter((len(idx) for idx in neighbors), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        indices = np.concatenate(neighbors).astype(np.int64, copy=False)
+        rows = np.repeat(np.arange(n), counts)
+        
+        # Zero distances (duplicate coordinates, the diagonal) stay as explicit entries
+        data = self.haversine_vectorized(lat[rows], lon[rows], lat[indices], lon[indices])
+        data = data.astype(self.distance_dtype, copy=False)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n, n))
+    
+    def resolve_neighbor_backend(self, n_points: int, neighbor_backend: str) -> str:
+        if neighbor_backend not in NEIGHBOR_BACKENDS:
+            raise ValueError(f"neighbor_backend must be one of: {list(NEIGHBOR_BACKENDS)}")
+        if neighbor_backend == 'auto':
+            return 'graph' if n_points > DENSE_MAX_POINTS else 'dense'
+        return neighbor_backend
+        
+    def collapse_coordinates(self, coordinates: np.ndarray,
+                             snap_decimals: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Unique points, their report counts and each report's point index. Points keep
+        # the order of their first report, so DBSCAN over the weighted points numbers
+        # clusters as it would over the reports. Without snapping only exact duplicates
+        # merge and the labels are unchanged.
+        keys = coordinates if snap_decimals is None else np.round(coordinates, snap_decimals)
+        _, first, inverse, counts = np.unique(keys, axis=0, return_index=True,
+                                              return_inverse=True, return_counts=True)
+        order = np.argsort(first, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        return keys[first[order]], counts[order].astype(np.float64), rank[inverse.ravel()]
+    
+    def load_data_from_json(self, json_data: List[Dict]) -> None:
+        with self.stage('load'):
+            # Decode the declared report fields into typed columns: float coordinates,
+            # categorical product/scannedBy/scanResult and datetime64 scannedAt
+            self.data = decode_reports(json_data)
+            
+            # Drop rows with invalid coordinates
+            self.data = self.data.dropna(subset=['latitude', 'longitude'])
+    
+    def load_data_from_columns(self, columns: ReportColumns) -> None:
+        # Streamed and binary reports arrive already split into columns; they are typed
+        # by the same report schema as JSON reports
+        with self.stage('load'):
+            if len(columns) > 0 and not columns.has_coordinates:
+                raise ValueError("Data must contain 'lat'/'long' or 'latitude'/'longitude' columns")
+            
+            self.data = columns.to_frame()
+            
+            # Drop rows with invalid coordinates
+            self.data = self.data.dropna(subset=['latitude', 'longitude'])
+    
+    def preprocess_data(self) -> None:
+        if self.data is None:
+            raise ValueError("No data loaded.")
+        
+        with self.stage('preprocess'):
+            # Remove duplicates and handle missing values. Times are left as they are:
+            # a report without a valid scannedAt must not inherit its neighbor's and
+            # count as timed in windowed analysis
+            self.data = self.data.drop_duplicates()
+            fill = [column for column in self.data.columns
+                    if column != 'scannedAt' and not pd.api.types.is_datetime64_any_dtype(self.data[column])]
+            self.data[fill] = self.data[fill].ffill()
+    
+    def calculate_cluster_statistics(self, cluster_labels: np.ndarray) -> Dict[int, Dict[str, Any]]:
+        # Size, centroid, max radius and category counts for every cluster in one
+        # grouped pass over the label array; noise (label -1) is left out
+        labels = np.asarray(cluster_labels)
+        clustered = np.flatnonzero(labels >= 0)
+        if len(clustered) == 0:
+            return {}
+        
+        cluster_ids, group, sizes = np.unique(labels[clustered], return_inverse=True, return_counts=True)
+        lat = self.data['latitude'].to_numpy(dtype=np.float64)[clustered]
+        lng = self.data['longitude'].to_numpy(dtype=np.float64)[clustered]
+        center_lat = np.bincount(group, weights=lat) / sizes
+        center_lng = np.bincount(group, weights=lng) / sizes
+        
+        # Cluster radius is the largest distance from any member to its centroid
+        distances = self.haversine_vectorized(np.radians(center_lat)[group], np.radians(center_lng)[group],
+                                              np.radians(lat), np.radians(lng))
+        radius = np.zeros(len(cluster_ids))
+        np.maximum.at(radius, group, distances)
+        
+        stats = {}
+        for k, label in enumerate(cluster_ids):
+            stats[int(label)] = {
+                'cluster_id': int(label),
+                'size': int(sizes[k]),
+                'center': {'latitude': float(center_lat[k]), 'longitude': float(center_lng[k])},
+                'radius_km': float(radius[k])
+            }
+        
+        # Breakdown by scan result and product; JSON keys are always strings
+        for column, key in (('scanResult', 'scan_result_counts'), ('product', 'product_counts')):
+            if column not in self.data.columns:
+                continue
+            for cluster in stats.values():
+                cluster[key] = {}
+            values = self.data[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Count (cluster, category code) pairs in one bincount
+                codes = values.cat.codes.to_numpy()[clustered]
+                valid = codes >= 0
+                n_categories = len(values.cat.categories)
+                counts = np.bincount(group[valid] * n_categories + codes[valid],
+                                     minlength=len(cluster_ids) * n_categories).reshape(len(cluster_ids), n_categories)
+                names = [str(value) for value in values.cat.categories]
+                for k, code in zip(*np.nonzero(counts)):
+                    stats[int(cluster_ids[k])][key][names[code]] = int(counts[k, code])
+                continue
+            grouped = pd.DataFrame({
+                'cluster': labels[clustered],
+                'value': self.data[column].to_numpy()[clustered]
+            }).groupby(['cluster', 'value'], sort=False).size()
+            for (label, value), count in grouped.items():
+                stats[int(label)][key][str(value)] = int(count)
+        
+        return stats
+    
+    def group_records_by_label(self, cluster_labels: np.ndarray) -> Dict[int, List[Dict]]:
+        # Row records split by label with one conversion and one stable sort, keeping
+        # the original row order inside each group
+        labels = np.asarray(cluster_labels)
+        data = self.data
+        timestamps = [column for column in data.columns if isinstance(data[column].dtype, pd.DatetimeTZDtype)]
+        if timestamps:
+            # Timestamps go back out as ISO 8601 strings, missing ones as null
+            data = data.assign(**{column: data[column].map(lambda value: value.isoformat(), na_action='ignore')
+                                  .astype(object).where(data[column].notna(), None)
+                                  for column in timestamps})
+        records = data.to_dict('records')
+        order = np.argsort(labels, kind='stable')
+        sorted_labels = labels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        return {int(sorted_labels[start]): [records[i] for i in order[start:end]]
+                for start, end in zip(starts, ends)}
+    
+    def build_assignments(self) -> Dict[str, List]:
+        # Columnar labels, one entry per clustered report. input_index is the report's
+        # position in the submitted list; reports dropped for invalid coordinates or as
+        # duplicates have no entry
+        assignments = {
+            'input_index': self.data.index.to_numpy().tolist(),
+            'cluster': np.asarray(self.clusters).tolist()
+        }
+        if '_id' in self.data.columns:
+            assignments['_id'] = self.data['_id'].tolist()
+        return assignments
+    
+    def build_zoom_pyramid(self, max_zoom: int = PYRAMID_MAX_ZOOM) -> ZoomPyramid:
+        # Map aggregates of the clustered reports for every zoom level up to max_zoom
+        if self.data is None or self.clusters is None:
+            raise ValueError("No clustering data available. Run dbscan_clustering first.")
+        with self.stage('pyramid'):
+            return ZoomPyramid(self.data['latitude'].to_numpy(dtype=np.float64),
+                               self.data['longitude'].to_numpy(dtype=np.float64),
+                               np.asarray(self.clusters), report_index=self.data.index.to_numpy(),
+                               max_zoom=max_zoom)
+    
+    def build_cluster_boundaries(self, max_vertices: Optional[int] = None) -> Dict[str, Any]:
+        # GeoJSON outline of every cluster, simplified to max_vertices if given
+        if self.data is None or self.clusters is None:
+            raise ValueError("No clustering data available. Run dbscan_clustering first.")
+        with self.stage('boundaries'):
+            return cluster_boundaries(self.data['latitude'].to_numpy(dtype=np.float64),
+                                      self.data['longitude'].to_numpy(dtype=np.float64),
+                                      np.asarray(self.clusters), max_vertices=max_vertices)
+    
+    def dbscan_clustering(self, eps_km: float = 5.0, min_samples: int = 3,
+                          neighbor_backend: str = 'auto', n_jobs: Optional[int] = None,
+                          include_points: bool = True, collapse_points: bool = True,
+                          snap_decimals: Optional[int] = None) -> Dict[str, Any]:
+        if self.data is None:
+            raise ValueError("No data loaded.")
+        
+        # Check if required columns exist
+        required_cols = ['latitude', 'longitude']
+        if not all(col in self.data.columns for col in required_cols):
+            raise ValueError(f"Data must contain columns: {required_cols}")
+        
+        from sklearn.cluster import DBSCAN
+        from partitioned import partitioned_dbscan
+        
+        # Extract coordinates
+        coordinates = self.data[['latitude', 'longitude']].values
+        
+        # Reports sharing a location (same kiosk or store) become one point weighted by
+        # its report count, so neighbor search and DBSCAN run over unique locations
+        with self.stage('collapse'):
+            if collapse_points:
+                points, weights, point_index = self.collapse_coordinates(coordinates, snap_decimals)
+            else:
+                points, weights, point_index = coordinates, None, None
+        
+        # Haversine distances either as a dense n x n matrix or as a sparse graph
+        # holding only pairs within eps_km; the partitioned backend produces the same
+        # labels from per-cell graphs built in parallel
+        backend = self.resolve_neighbor_backend(len(points), neighbor_backend)
+        if backend == 'partitioned':
+            with self.stage('cluster'):
+                point_labels = partitioned_dbscan(points, eps_km, min_samples, sample_weight=weights,
+                                                  max_workers=n_jobs)
+        else:
+            with self.stage('neighbors'):
+                if backend == 'graph':
+                    distances = self.calculate_neighbor_graph(points, eps_km)
+                else:
+                    distances = self.calculate_distance_matrix(points)
+            
+            # Run DBSCAN with precomputed distances
+            with self.stage('cluster'):
+                dbscan = DBSCAN(eps=eps_km, min_samples=min_samples, metric='precomputed')
+                point_labels = dbscan.fit_predict(distances, sample_weight=weights)
+        
+        # Every report takes the label of its point
+        cluster_labels = point_labels if point_index is None else point_labels[point_index]
+        
+        clustering_params = {
+            'clustering_mode': 'dbscan',
+            'eps_km': eps_km,
+            'min_samples': min_samples,
+            'neighbor_backend': backend,
+            'distance_dtype': self.distance_dtype.name,
+            'collapse_points': collapse_points,
+            'snap_decimals': snap_decimals
+        }
+        return self.build_clustering_results(cluster_labels, clustering_params, len(points), include_points)
+    
+    def build_clustering_results(self, cluster_labels: np.ndarray, clustering_params: Dict[str, Any],
+                                 effective_points: int, include_points: bool = True) -> Dict[str, Any]:
+        # Result structure shared by every clustering mode, from one label per report
+        n_points = len(cluster_labels)
+        
+        # Add cluster labels to data
+        self.data['cluster'] = cluster_labels
+        self.clusters = cluster_labels
+        
+        with self.stage('stats'):
+            # Calculate cluster statistics
+            n_clusters = len(np.unique(cluster_labels[cluster_labels >= 0]))
+            n_noise = int(np.count_nonzero(cluster_labels == -1))
+            self.cluster_statistics = self.calculate_cluster_statistics(cluster_labels)
+            
+            # Attach member records to each cluster, with noise rows returned separately,
+            # unless the caller only wants summaries and the per-report label columns
+            if include_points:
+                records_by_label = self.group_records_by_label(cluster_labels)
+                cluster_stats = [{**stats, 'points': records_by_label[label]}
+                                 for label, stats in self.cluster_statistics.items()]
+            else:
+                cluster_stats = list(self.cluster_statistics.values())
+            
+            # Sort clusters by size (largest first)
+            cluster_stats.sort(key=lambda x: x['size'], reverse=True)
+            
+            results = {
+                'clustering_params': clustering_params,
+                'summary': {
+                    'total_points': n_points,
+                    'effective_points': effective_points,
+                    'n_clusters': n_clusters,
+                    'n_noise_points': n_noise,
+                    'noise_percentage': (n_noise / n_points) * 100 if n_points > 0 else 0
+                },
+                'clusters': cluster_stats,
+                'timestamp': datetime.now().isoformat()
+            }
+            if include_points:
+                results['noise_points'] = records_by_label.get(-1, [])
+            else:
+                results['assignments'] = self.build_assignments()
+        
+        return results
+    
+    def compute_density_hierarchy(self, min_samples: int = 3, max_eps_km: float = 5.0,
+                                  collapse_points: bool = True,
+                                  snap_decimals: Optional[int] = None) -> Dict[str, Any]:
+        # OPTICS ordering and reachability up to max_eps_km, from which DBSCAN labels
+        # for any eps_km <= max_eps_km are cut in milliseconds (see cluster_from_hierarchy)
+        if self.data is None:
+            raise ValueError("No data loaded.")
+        from hierarchy import density_hierarchy
+        
+        coordinates = self.data[['latitude', 'longitude']].values
+        with self.stage('collapse'):
+            if collapse_points:
+                points, weights, point_index = self.collapse_coordinates(coordinates, snap_decimals)
+            else:
+                points, weights, point_index = coordinates, None, np.arange(len(coordinates))
+        
+        with self.stage('neighbors'):
+            graph = self.calculate_neighbor_graph(points, max_eps_km)
+        
+        with self.stage('cluster'):
+            hierarchy = density_hierarchy(graph, min_samples, sample_weight=weights)
+        
+        hierarchy.update({
+            'point_index': point_index,
+            'min_samples': min_samples,
+            'max_eps_km': max_eps_km,
+            'collapse_points': collapse_points,
+            'snap_decimals': snap_decimals
+        })
+        return hierarchy
+    
+    def cluster_from_hierarchy(self, hierarchy: Dict[str, Any], eps_km: float,
+                               include_points: bool = True) -> Dict[str, Any]:
+        # Same result structure as dbscan_clustering. Core points get the labels DBSCAN
+        # would give them; a border point reachable from two clusters may join the other
+        # one. Cluster ids follow the OPTICS ordering.
+        if eps_km > hierarchy['max_eps_km']:
+            raise ValueError(f"eps_km cannot exceed the hierarchy's max_eps_km ({hierarchy['max_eps_km']})")
+        from hierarchy import hierarchy_labels
+        
+        with self.stage('cluster'):
+            point_labels = hierarchy_labels(hierarchy, eps_km)
+            cluster_labels = point_labels[hierarchy['point_index']]
+        
+        clustering_params = {
+            'clustering_mode': 'optics',
+            'eps_km': eps_km,
+            'min_samples': hierarchy['min_samples'],
+            'max_eps_km': hierarchy['max_eps_km'],
+            'distance_dtype': self.distance_dtype.name,
+            'collapse_points': hierarchy['collapse_points'],
+            'snap_decimals': hierarchy['snap_decimals']
+        }
+        return self.build_clustering_results(cluster_labels, clustering_params,
+                                             len(hierarchy['ordering']), include_points)
+    
+    def dbscan_parameter_sweep(self, eps_values: List[float], min_samples_values: List[int],
+                               collapse_points: bool = True,
+                               snap_decimals: Optional[int] = None) -> Dict[str, Any]:
+        # Summaries for every eps_km x min_samples combination from one neighbor graph
+        # built at the largest eps; DBSCAN applies each smaller eps cut to the stored
+        # distances, so each combination costs a pass over the graph, not a new search
+        if self.data is None:
+            raise ValueError("No data loaded.")
+        from sklearn.cluster import DBSCAN
+        
+        coordinates = self.data[['latitude', 'longitude']].values
+        with self.stage('collapse'):
+            if collapse_points:
+                points, weights, _ = self.collapse_coordinates(coordinates, snap_decimals)
+            else:
+                points, weights = coordinates, np.ones(len(coordinates))
+        
+        max_eps = max(eps_values)
+        with self.stage('neighbors'):
+            graph = self.calculate_neighbor_graph(points, max_eps)
+        
+        combinations = []
+        with self.stage('cluster'):
+            for eps_km in sorted(set(eps_values)):
+                for min_samples in sorted(set(min_samples_values)):
+                    dbscan = DBSCAN(eps=eps_km, min_samples=min_samples, metric='precomputed')
+                    labels = dbscan.fit_predict(graph, sample_weight=weights)
+                    
+                    # Sizes count reports, not collapsed points
+                    clustered = labels >= 0
+                    sizes = np.bincount(labels[clustered], weights=weights[clustered])
+                    n_noise = int(round(weights[~clustered].sum()))
+                    combinations.append({
+                        'eps_km': eps_km,
+                        'min_samples': min_samples,
+                        'n_clusters': len(sizes),
+                        'n_noise_points': n_noise,
+                        'noise_percentage': (n_noise / len(coordinates)) * 100 if len(coordinates) > 0 else 0,
+                        'largest_cluster_size': int(round(sizes.max())) if len(sizes) else 0
+                    })
+        
+        return {
+            'sweep_params': {
+                'eps_km': sorted(set(eps_values)),
+                'min_samples': sorted(set(min_samples_values)),
+                'collapse_points': collapse_points,
+                'snap_decimals': snap_decimals
+            },
+            'summary': {
+                'total_points': len(coordinates),
+                'effective_points': len(points),
+                'neighbor_graph_eps_km': max_eps,
+                'neighbor_pairs': int(graph.nnz),
+                'n_combinations': len(combinations)
+            },
+            'combinations': combinations,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def windowed_clustering(self, windows: List[str], eps_km: float = 5.0, min_samples: int = 3,
+                            step: Optional[str] = None, end: Optional[str] = None,
+                            max_steps: int = 30) -> Dict[str, Any]:
+        # Hotspots for rolling scannedAt windows (e.g. last 24h, 7d, 30d). Each window
+        # length slides over a time-sorted index with incremental inserts and expiries;
+        # with a step, one snapshot is returned per window position.
+        if self.data is None:
+            raise ValueError("No data loaded.")
+        if 'scannedAt' not in self.data.columns:
+            raise ValueError("Reports must carry scannedAt for windowed analysis")
+        from windows import SlidingWindowClustering, parse_duration, window_end_times
+        
+        scanned_at = self.data['scannedAt']
+        if not isinstance(scanned_at.dtype, pd.DatetimeTZDtype):
+            scanned_at = pd.to_datetime(scanned_at, errors='coerce', utc=True)
+        timed = scanned_at.notna().to_numpy()
+        times = scanned_at[timed].dt.tz_convert(None).to_numpy()
+        latitudes = self.data['latitude'].to_numpy(dtype=np.float64)[timed]
+        longitudes = self.data['longitude'].to_numpy(dtype=np.float64)[timed]
+        
+        if end is not None:
+            end_time = pd.Timestamp(end)
+            end_time = end_time.tz_convert('UTC') if end_time.tzinfo else end_time.tz_localize('UTC')
+            end_time = end_time.tz_convert(None).to_datetime64()
+        else:
+            end_time = None
+        step_length = parse_duration(step) if step is not None else None
+        
+        results_by_window = []
+        with self.stage('cluster'):
+            for window in windows:
+                length = parse_duration(window)
+                sliding = SlidingWindowClustering(times, latitudes, longitudes, length.to_timedelta64(),
+                                                  eps_km, min_samples)
+                snapshots = []
+                if len(times):
+                    for window_end in window_end_times(sliding.times[0], sliding.times[-1], end_time,
+                                                       step_length, max_steps):
+                        sliding.advance(window_end)
+                        snapshots.append(sliding.snapshot())
+                results_by_window.append({
+                    'window': window,
+                    'length_seconds': length.total_seconds(),
+                    'snapshots': snapshots
+                })
+        
+        return {
+            'clustering_params': {
+                'clustering_mode': 'windows',
+                'eps_km': eps_km,
+                'min_samples': min_samples,
+                'windows': list(windows),
+                'step': step,
+                'end': end,
+                'max_steps': max_steps
+            },
+            'summary': {
+                'total_points': len(self.data),
+                'timed_points': int(timed.sum()),
+                'n_windows': len(results_by_window)
+            },
+            'windows': results_by_window,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def create_visualization_map(self, filename: str = "clusters_map.html", mode: str = 'auto') -> str:
+        # mode 'markers' draws every report as its own marker; 'clusters' draws one
+        # outline per cluster and noise binned into grid cells, so the page grows with
+        # the number of clusters instead of reports; 'marker_cluster' adds the reports
+        # to a client-side marker-cluster layer on top of the outlines; 'auto' uses
+        # markers up to MAP_MARKER_MAX_POINTS reports and clusters above
+        if self.data is None or self.clusters is None:
+            raise ValueError("No clustering data available. Run dbscan_clustering first.")
+        if mode not in MAP_MODES:
+            raise ValueError(f"mode must be one of: {list(MAP_MODES)}")
+        import folium
+        from folium.plugins import FastMarkerCluster
+        if mode == 'auto':
+            mode = 'markers' if len(self.data) <= MAP_MARKER_MAX_POINTS else 'clusters'
+        
+        # Calculate map center
+        center_lat = self.data['latitude'].mean()
+        center_lng = self.data['longitude'].mean()
+        
+        # Create folium map
+        m = folium.Map(location=[center_lat, center_lng], zoom_start=11)
+        
+        # Define colors for clusters
+        colors = ['red', 'blue', 'green', 'purple', 'orange', 'darkred', 'lightred', 
+                 'beige', 'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 
+                 'pink', 'lightblue', 'lightgreen', 'gray', 'black', 'lightgray']
+        
+        if mode == 'markers':
+            self._add_point_markers(m, colors)
+            legend_items = """
+        <p><i class="fa fa-circle" style="color:black"></i> Noise Points</p>
+        <p><i class="fa fa-circle" style="color:red"></i> Cluster Points</p>
+        <p><i class="fa fa-star" style="color:red"></i> Cluster Centers</p>
+        <p>Polygons show cluster boundaries</p>"""
+        else:
+            self._add_cluster_layers(m, colors)
+            legend_items = """
+        <p><i class="fa fa-square" style="color:black"></i> Noise density (binned)</p>
+        <p><i class="fa fa-circle" style="color:red"></i> Cluster outlines</p>
+        <p><i class="fa fa-map-marker" style="color:blue"></i> Cluster Centers</p>"""
+            if mode == 'marker_cluster':
+                points = self.data[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+                FastMarkerCluster(points.tolist(), name='Reports').add_to(m)
+                legend_items += """
+        <p>Numbered bubbles group reports</p>"""
+        
+        # Add legend
+        legend_html = f'''
+        <div style="position: fixed; 
+                    bottom: 50px; left: 50px; width: 200px; height: 120px; 
+                    background-color: white; border:2px solid grey; z-index:9999; 
+                    font-size:14px; padding: 10px">
+        <h4>DBSCAN Clusters</h4>{legend_items}
+        </div>
+        '''
+        m.get_root().html.add_child(folium.Element(legend_html))
+        
+        # Save map
+        m.save(filename)
+        print(f"✓ Visualization map ({mode}) saved as {filename}")
+        return filename
+    
+    def _add_point_markers(self, m: 'folium.Map', colors: List[str]) -> None:
+        import folium
+        
+        # Plot points and cluster boundaries
+        unique_labels = set(self.clusters)
+        outlines = {feature['properties']['cluster_id']: feature
+                    for feature in cluster_boundaries(self.data['latitude'].to_numpy(dtype=np.float64),
+                                                      self.data['longitude'].to_numpy(dtype=np.float64),
+                                                      np.asarray(self.clusters))['features']}
+        for label in unique_labels:
+            if label == -1:
+                # Noise points in black
+                cluster_data = self.data[self.data['cluster'] == label]
+                for _, point in cluster_data.iterrows():
+                    folium.CircleMarker(
+                        location=[point['latitude'], point['longitude']],
+                        radius=4,
+                        popup=f"Noise: {point.get('product', 'N/A')}",
+                        color='black',
+                        fill=True,
+                        fillColor='black',
+                        fillOpacity=0.7
+                    ).add_to(m)
+            else:
+                # Cluster points
+                cluster_data = self.data[self.data['cluster'] == label]
+                color = colors[label % len(colors)]
+                
+                # Create cluster polygon if the members span an area
+                outline = outlines[label]
+                if outline['properties']['outline'] == 'hull':
+                    folium.Polygon(
+                        locations=[[lat, lng] for lng, lat in outline['geometry']['coordinates'][0][:-1]],
+                        color=color,
+                        weight=3,
+                        fillColor=color,
+                        fillOpacity=0.2,
+                        popup=f"Cluster {label} Boundary ({len(cluster_data)} points)"
+                    ).add_to(m)
+                
+                # Add individual cluster points
+                for _, point in cluster_data.iterrows():
+                    folium.CircleMarker(
+                        location=[point['latitude'], point['longitude']],
+                        radius=6,
+                        popup=f"Cluster {label}: {point.get('product', 'N/A')}<br>User: {point.get('scannedBy', 'N/A')}",
+                        color=color,
+                        fill=True,
+                        fillColor=color,
+                        fillOpacity=0.8,
+                        weight=2
+                    ).add_to(m)
+                
+                # Add cluster center marker from the statistics computed during clustering
+                stats = self.cluster_statistics[label]
+                folium.Marker(
+                    location=[stats['center']['latitude'], stats['center']['longitude']],
+                    popup=f"Cluster {label} Center<br>{stats['size']} points<br>Radius: {stats['radius_km']:.2f}km",
+                    icon=folium.Icon(color='red', icon='star')
+                ).add_to(m)
+    
+    def _add_cluster_layers(self, m: 'folium.Map', colors: List[str]) -> None:
+        # GeoJSON layers: an outline per cluster (convex hull, or a circle of the cluster
+        # radius when the members are collinear or share one location), the binned
+        # noise, and the cluster centers
+        import folium
+        
+        labels = np.asarray(self.clusters)
+        lat = self.data['latitude'].to_numpy(dtype=np.float64)
+        lng = self.data['longitude'].to_numpy(dtype=np.float64)
+        
+        features = cluster_boundaries(lat, lng, labels)['features']
+        for feature in features:
+            label = feature['properties']['cluster_id']
+            stats = self.cluster_statistics[label]
+            products = stats.get('product_counts') or {}
+            feature['properties'] = {
+                'cluster_id': label,
+                'size': stats['size'],
+                'radius_km': round(stats['radius_km'], 3),
+                'top_product': max(products, key=products.get) if products else 'N/A',
+                'color': colors[label % len(colors)]
+            }
+        
+        if features:
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': features},
+                name='Clusters',
+                style_function=lambda feature: {
+                    'color': feature['properties']['color'],
+                    'fillColor': feature['properties']['color'],
+                    'weight': 2,
+                    'fillOpacity': 0.3
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['cluster_id', 'size', 'radius_km', 'top_product'],
+                                              aliases=['Cluster', 'Reports', 'Radius (km)', 'Top product'])
+            ).add_to(m)
+        
+        noise = labels == -1
+        if noise.any():
+            folium.GeoJson(
+                noise_cells(lat[noise], lng[noise]),
+                name='Noise',
+                style_function=lambda feature: {
+                    'color': 'black',
+                    'weight': 0,
+                    'fillColor': 'black',
+                    'fillOpacity': feature['properties']['opacity']
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['count'], aliases=['Noise reports'])
+            ).add_to(m)
+        
+        # Centers as one point layer; a folium.Marker each would cost a template render
+        if features:
+            centers = []
+            for feature in features:
+                center = self.cluster_statistics[feature['properties']['cluster_id']]['center']
+                centers.append({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [center['longitude'], center['latitude']]},
+                    'properties': feature['properties']
+                })
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': centers},
+                name='Cluster centers',
+                popup=folium.GeoJsonPopup(fields=['cluster_id', 'size', 'radius_km'],
+                                          aliases=['Cluster center', 'Points', 'Radius (km)'])
+            ).add_to(m)
+
+
+def noise_cells(lat: np.ndarray, lng: np.ndarray) -> Dict[str, Any]:
+    # Noise reports counted per square grid cell as a GeoJSON FeatureCollection; the
+    # grid coarsens until there are at most MAP_NOISE_MAX_CELLS occupied cells
+    cell = MAP_NOISE_CELL_DEGREES
+    while True:
+        keys = np.column_stack([np.floor(lat / cell), np.floor(lng / cell)])
+        cells, counts = np.unique(keys, axis=0, return_counts=True)
+        if len(cells) <= MAP_NOISE_MAX_CELLS:
+            break
+        cell *= 2
+    
+    opacity = 0.2 + 0.6 * np.log1p(counts) / np.log1p(counts.max())
+    features = []
+    for (row, col), count, alpha in zip(cells.tolist(), counts.tolist(), opacity.tolist()):
+        south, west = row * cell, col * cell
+        features.append({
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[[west, south], [west + cell, south], [west + cell, south + cell],
+                                 [west, south + cell], [west, south]]]
+            },
+            'properties': {'count': count, 'opacity': round(alpha, 2)}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
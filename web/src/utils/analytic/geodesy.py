@@ -0,0 +1,16 @@
+import numpy as np
+
+# Radius of Earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    # Great-circle distance on radian arrays that broadcast together. Every backend cuts
+    # at eps with this kernel, so their neighborhoods agree exactly.
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+
+    # Clip guards arcsin against rounding just above 1 for antipodal points
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return c * EARTH_RADIUS_KM
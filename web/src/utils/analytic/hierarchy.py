@@ -0,0 +1,87 @@
+import heapq
+from typing import Dict, Any, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import cluster_optics_dbscan
+
+
+def core_distances(graph: sparse.csr_matrix, weights: np.ndarray, min_samples: float) -> np.ndarray:
+    # Distance at which a point's neighborhood (itself included) first weighs
+    # min_samples; inf when that never happens within the graph's radius
+    n = graph.shape[0]
+    counts = np.diff(graph.indptr)
+    rows = np.repeat(np.arange(n), counts)
+    order = np.lexsort((graph.data, rows))
+    distances = graph.data[order]
+
+    # Running neighborhood weight within each row, nearest neighbor first
+    cumulative = np.cumsum(weights[graph.indices[order]])
+    before_row = np.concatenate([[0.0], cumulative])[graph.indptr[:-1]]
+    reached = np.flatnonzero(cumulative - np.repeat(before_row, counts) >= min_samples)
+
+    result = np.full(n, np.inf)
+    reached_rows, first = np.unique(rows[order][reached], return_index=True)
+    result[reached_rows] = distances[reached[first]]
+    return result
+
+
+def density_hierarchy(graph: sparse.csr_matrix, min_samples: float,
+                      sample_weight: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    # OPTICS ordering and reachability over a radius neighbor graph (distances in km,
+    # self-pairs included). The graph's radius plays the role of OPTICS max_eps, so
+    # DBSCAN labels can be cut from the result for any eps up to that radius. Ties in
+    # reachability go to the lowest index, as in sklearn's OPTICS.
+    graph = sparse.csr_matrix(graph)
+    n = graph.shape[0]
+    weights = np.ones(n) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+    core = core_distances(graph, weights, min_samples)
+    reachability = np.full(n, np.inf)
+    predecessor = np.full(n, -1, dtype=np.int64)
+    processed = np.zeros(n, dtype=bool)
+    ordering = np.empty(n, dtype=np.int64)
+
+    heap = []
+    next_unvisited = 0
+    for position in range(n):
+        # Lowest reachability among seen points; lazily skip stale heap entries
+        point = -1
+        while heap:
+            _, candidate = heapq.heappop(heap)
+            if not processed[candidate]:
+                point = candidate
+                break
+        if point < 0:
+            while processed[next_unvisited]:
+                next_unvisited += 1
+            point = next_unvisited
+
+        processed[point] = True
+        ordering[position] = point
+        if not np.isfinite(core[point]):
+            continue
+
+        start, stop = graph.indptr[point], graph.indptr[point + 1]
+        neighbors = graph.indices[start:stop]
+        reach = np.maximum(graph.data[start:stop], core[point])
+        improved = ~processed[neighbors] & (reach < reachability[neighbors])
+        for neighbor, value in zip(neighbors[improved].tolist(), reach[improved].tolist()):
+            reachability[neighbor] = value
+            predecessor[neighbor] = point
+            heapq.heappush(heap, (value, neighbor))
+
+    return {
+        'ordering': ordering,
+        'reachability': reachability,
+        'core_distances': core,
+        'predecessor': predecessor
+    }
+
+
+def hierarchy_labels(hierarchy: Dict[str, Any], eps_km: float) -> np.ndarray:
+    # DBSCAN labels at eps_km; core points match DBSCAN exactly, border points may
+    # fall to a different neighboring cluster or to noise, as with any OPTICS cut
+    return cluster_optics_dbscan(reachability=hierarchy['reachability'],
+                                 core_distances=hierarchy['core_distances'],
+                                 ordering=hierarchy['ordering'], eps=eps_km)
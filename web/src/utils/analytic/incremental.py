@@ -0,0 +1,365 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from geodesy import EARTH_RADIUS_KM, haversine_km
+
+# Initial capacity of the growable per-point arrays
+INITIAL_CAPACITY = 1024
+
+# From this many points on, neighborhoods are found with one k-d tree query over the
+# points in the grid cells around the batch instead of a grid lookup per point
+BATCH_QUERY_MIN_POINTS = 256
+
+# Estimated bytes per point held in Python lists (grid index, cluster members, ids)
+# on top of the numpy arrays
+PYTHON_BYTES_PER_POINT = 120
+
+# Offsets of a grid cell and its 26 surrounding cells
+CELL_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+
+
+class IncrementalDBSCAN:
+    # DBSCAN state that survives between calls: coordinates, neighbor counts, core
+    # flags, labels and a grid index over unit-sphere coordinates. Inserting a batch
+    # only visits the neighborhoods of the new points and of points that became core,
+    # so an update costs O(batch neighborhoods) rather than O(history).
+    #
+    # Cluster ids are stable across updates: when clusters merge, the smaller one is
+    # relabeled into the larger one, and when a deletion splits a cluster its largest
+    # part keeps the id. Ids are therefore not contiguous.
+    #
+    # Deleted points keep their index (label -1, no longer active) so indices handed
+    # out earlier stay valid.
+
+    def __init__(self, eps_km: float = 5.0, min_samples: int = 3):
+        if eps_km <= 0:
+            raise ValueError("eps_km must be positive")
+        if min_samples < 1:
+            raise ValueError("min_samples must be at least 1")
+
+        self.eps_km = eps_km
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+        # Points within eps_km on the sphere are within this chord length in 3D, so
+        # every neighbor lies in one of the 27 grid cells around a point's own cell
+        # (slightly inflated so rounding cannot push a point at exactly eps further out)
+        self._cell_size = 2 * np.sin(min(eps_km / EARTH_RADIUS_KM, np.pi) / 2) * (1 + 1e-9)
+        self._cells: Dict[tuple, List[int]] = defaultdict(list)
+
+        self._size = 0
+        self._lat = np.empty(INITIAL_CAPACITY)
+        self._lon = np.empty(INITIAL_CAPACITY)
+        self._xyz = np.empty((INITIAL_CAPACITY, 3))
+        self._neighbor_counts = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._core = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._labels = np.full(INITIAL_CAPACITY, -1, dtype=np.int64)
+        self._active = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._n_active = 0
+        self.ids: List[Any] = []
+
+        self._members: Dict[int, List[int]] = {}
+        self._next_label = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        # Estimated memory held by the model
+        arrays = (self._lat, self._lon, self._xyz, self._neighbor_counts, self._core, self._labels, self._active)
+        return sum(array.nbytes for array in arrays) + self._size * PYTHON_BYTES_PER_POINT
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._labels[:self._size]
+
+    @property
+    def core_mask(self) -> np.ndarray:
+        return self._core[:self._size]
+
+    @property
+    def active_mask(self) -> np.ndarray:
+        return self._active[:self._size]
+
+    def _ensure_capacity(self, required: int) -> None:
+        capacity = len(self._lat)
+        if required <= capacity:
+            return
+
+        while capacity < required:
+            capacity *= 2
+
+        def grow(array: np.ndarray, fill) -> np.ndarray:
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self._lat = grow(self._lat, 0.0)
+        self._lon = grow(self._lon, 0.0)
+        self._xyz = grow(self._xyz, 0.0)
+        self._neighbor_counts = grow(self._neighbor_counts, 0)
+        self._core = grow(self._core, False)
+        self._labels = grow(self._labels, -1)
+        self._active = grow(self._active, False)
+
+    def _cell_of(self, index: int) -> tuple:
+        return tuple(np.floor(self._xyz[index] / self._cell_size).astype(np.int64))
+
+    def _neighbors(self, index: int) -> np.ndarray:
+        # Candidates from the surrounding cells, then the exact haversine cut used by
+        # AnalyticsProcessor (the point itself is included, as in DBSCAN)
+        candidates = self._candidates([self._cell_of(index)])
+
+        distances = haversine_km(self._lat[index], self._lon[index], self._lat[candidates], self._lon[candidates])
+        return candidates[distances <= self.eps_km]
+
+    def _candidates(self, cells) -> np.ndarray:
+        # Indices of the points in the given grid cells and the cells around them
+        around = {(cx + dx, cy + dy, cz + dz) for cx, cy, cz in cells for dx, dy, dz in CELL_OFFSETS}
+        buckets = [self._cells.get(cell) for cell in around]
+        return np.fromiter((j for bucket in buckets if bucket for j in bucket), dtype=np.int64)
+
+    def _neighbor_pairs(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # (point, neighbor) pairs for every point in indices, sorted by point then
+        # neighbor, from one k-d tree query and the same exact cut as _neighbors. The
+        # tree only holds the points in the cells around the batch, so its cost follows
+        # the batch's neighborhoods rather than the history.
+        from scipy.spatial import cKDTree
+
+        indices = np.asarray(indices, dtype=np.int64)
+        cells = np.unique(np.floor(self._xyz[indices] / self._cell_size).astype(np.int64), axis=0)
+        candidates = self._candidates(map(tuple, cells.tolist()))
+        pairs = cKDTree(self._xyz[indices]).sparse_distance_matrix(
+            cKDTree(self._xyz[candidates]), self._cell_size, output_type='ndarray')
+        rows = indices[pairs['i']]
+        cols = candidates[pairs['j']]
+
+        within = haversine_km(self._lat[rows], self._lon[rows], self._lat[cols], self._lon[cols]) <= self.eps_km
+
+        rows = rows[within]
+        cols = cols[within]
+        order = np.lexsort((cols, rows))
+        return rows[order], cols[order]
+
+    def _neighborhoods(self, indices: Sequence[int]) -> Dict[int, np.ndarray]:
+        # Sorted neighbor indices for several points
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) < BATCH_QUERY_MIN_POINTS:
+            return {int(index): np.sort(self._neighbors(int(index))) for index in indices}
+
+        rows, cols = self._neighbor_pairs(indices)
+        unique_indices = np.unique(indices)
+        bounds = np.searchsorted(rows, np.r_[unique_indices, np.iinfo(np.int64).max])
+        return {int(index): cols[bounds[k]:bounds[k + 1]] for k, index in enumerate(unique_indices)}
+
+    def _assign(self, index: int, label: int, before: Dict[int, int]) -> None:
+        current = int(self._labels[index])
+        if current == label:
+            return
+        before.setdefault(index, current)
+        if current >= 0:
+            self._members[current].remove(index)
+        self._members[label].append(index)
+        self._labels[index] = label
+
+    def _merge(self, labels: Sequence[int], before: Dict[int, int]) -> int:
+        # Relabel smaller clusters into the largest one so each point moves O(log n) times
+        target = max(labels, key=lambda label: len(self._members[label]))
+        for label in labels:
+            if label == target:
+                continue
+            moved = self._members.pop(label)
+            for index in moved:
+                before.setdefault(index, label)
+            self._labels[moved] = target
+            self._members[target].extend(moved)
+        return target
+
+    def insert(self, latitudes: Sequence[float], longitudes: Sequence[float],
+               ids: Optional[Sequence[Any]] = None) -> Dict[int, int]:
+        # Add a batch of points (decimal degrees) and return {point index: new label}
+        # for every new point and every existing point whose label changed
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        if latitudes.shape != longitudes.shape:
+            raise ValueError("latitudes and longitudes must have the same length")
+
+        batch = len(latitudes)
+        start = self._size
+        stop = start + batch
+        self._ensure_capacity(stop)
+
+        lat = np.radians(latitudes)
+        lon = np.radians(longitudes)
+        self._lat[start:stop] = lat
+        self._lon[start:stop] = lon
+        self._xyz[start:stop, 0] = np.cos(lat) * np.cos(lon)
+        self._xyz[start:stop, 1] = np.cos(lat) * np.sin(lon)
+        self._xyz[start:stop, 2] = np.sin(lat)
+        self._size = stop
+        self._active[start:stop] = True
+        self._n_active += batch
+        self.ids.extend(ids if ids is not None else [None] * batch)
+
+        for index in range(start, stop):
+            self._cells[self._cell_of(index)].append(index)
+
+        # Neighbor counts only grow on insertion, so core points stay core and the
+        # only structural changes are new cores, merges and noise becoming border
+        neighborhoods = self._neighborhoods(np.arange(start, stop))
+        for index in range(start, stop):
+            neighbors = neighborhoods[index]
+            self._neighbor_counts[index] = len(neighbors)
+            np.add.at(self._neighbor_counts, neighbors[neighbors < start], 1)
+
+        touched = set(range(start, stop))
+        for neighbors in neighborhoods.values():
+            touched.update(neighbors[neighbors < start].tolist())
+        new_cores = sorted(index for index in touched
+                           if not self._core[index] and self._neighbor_counts[index] >= self.min_samples)
+        self._core[new_cores] = True
+        neighborhoods.update(self._neighborhoods([index for index in new_cores if index not in neighborhoods]))
+
+        before: Dict[int, int] = {}
+        for index in new_cores:
+            neighbors = neighborhoods[index]
+
+            core_neighbors = neighbors[self._core[neighbors]]
+            linked = {int(label) for label in self._labels[core_neighbors] if label >= 0}
+            if linked:
+                label = self._merge(sorted(linked), before)
+            else:
+                label = self._next_label
+                self._next_label += 1
+                self._members[label] = []
+            self._assign(index, label, before)
+
+            # Noise within reach of the new core becomes a border point of its cluster
+            for neighbor in neighbors[~self._core[neighbors]]:
+                if self._labels[neighbor] == -1:
+                    self._assign(int(neighbor), label, before)
+
+        # New non-core points join the cluster of any core neighbor, otherwise noise
+        for index in range(start, stop):
+            if self._core[index] or self._labels[index] >= 0:
+                continue
+            neighbors = neighborhoods[index]
+            core_neighbors = neighbors[self._core[neighbors]]
+            if len(core_neighbors):
+                self._assign(index, int(self._labels[core_neighbors[0]]), before)
+
+        changed = {index: int(self._labels[index]) for index in range(start, stop)}
+        for index, previous in before.items():
+            if index < start and self._labels[index] != previous:
+                changed[index] = int(self._labels[index])
+        return changed
+
+    def delete(self, indices: Sequence[int]) -> Dict[int, int]:
+        # Remove points and return {point index: new label} for every remaining point
+        # whose label changed. Only clusters that lost a point or a core are rebuilt;
+        # a cluster can only split, never merge, when points leave.
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        indices = indices[self._active[indices]] if len(indices) else indices
+        if len(indices) == 0:
+            return {}
+
+        neighborhoods = list(self._neighborhoods(indices).values())
+        for index in indices.tolist():
+            self._cells[self._cell_of(index)].remove(index)
+        self._active[indices] = False
+        self._n_active -= len(indices)
+
+        # Clusters holding a deleted point need rebuilding; counts drop around it
+        affected = {int(label) for label in self._labels[indices] if label >= 0}
+        before: Dict[int, int] = {}
+        for index in indices.tolist():
+            label = int(self._labels[index])
+            if label >= 0:
+                self._members[label].remove(index)
+            self._labels[index] = -1
+            self._core[index] = False
+        touched = np.concatenate(neighborhoods)
+        touched = touched[self._active[touched]]
+        np.subtract.at(self._neighbor_counts, touched, 1)
+
+        # Cores that fell below min_samples also invalidate their cluster
+        touched = np.unique(touched)
+        demoted = touched[self._core[touched] & (self._neighbor_counts[touched] < self.min_samples)]
+        self._core[demoted] = False
+        affected.update(int(label) for label in self._labels[demoted] if label >= 0)
+
+        if affected:
+            self._rebuild(sorted(affected), before)
+
+        return {index: int(self._labels[index]) for index, previous in before.items()
+                if self._active[index] and self._labels[index] != previous}
+
+    def _rebuild(self, labels: List[int], before: Dict[int, int]) -> None:
+        # Re-derive clusters from their remaining cores: connected groups of cores
+        # become clusters (the largest part of each old cluster keeps its id), members
+        # without a core neighbor in any cluster become noise. Core neighbors of a core
+        # always share its cluster, so the components never reach outside `labels`.
+        members = np.array([index for label in labels for index in self._members.pop(label)], dtype=np.int64)
+        old_labels = self._labels[members].copy()
+        for index, label in zip(members.tolist(), old_labels.tolist()):
+            before.setdefault(index, label)
+        self._labels[members] = -1
+
+        rows, cols = self._neighbor_pairs(members)
+        local = np.full(self._size, -1, dtype=np.int64)
+        local[members] = np.arange(len(members))
+
+        # Components over core-core links, named after the old cluster they came from
+        link = self._core[rows] & self._core[cols]
+        graph = sparse.csr_matrix((np.ones(np.count_nonzero(link), dtype=np.int8),
+                                   (local[rows[link]], local[cols[link]])), shape=(len(members), len(members)))
+        _, component = connected_components(graph, directed=False)
+        is_core = self._core[members]
+        core_component = component[is_core]
+        core_old = old_labels[is_core]
+        comp_ids, first, sizes = np.unique(core_component, return_index=True, return_counts=True)
+
+        # Largest part of each old cluster keeps the old id (ties to the lowest component)
+        comp_label = np.empty(len(comp_ids), dtype=np.int64)
+        kept = set()
+        for k in np.lexsort((comp_ids, -sizes)).tolist():
+            old = int(core_old[first[k]])
+            if old in kept:
+                comp_label[k] = self._next_label
+                self._next_label += 1
+            else:
+                kept.add(old)
+                comp_label[k] = old
+        new_core_labels = comp_label[np.searchsorted(comp_ids, core_component)]
+        core_members = members[is_core]
+        self._labels[core_members] = new_core_labels
+
+        # Former border points stay attached if some core neighbor still reaches them;
+        # the lowest-index core neighbor decides, as in _neighbors order for inserts
+        reach = ~self._core[rows] & self._core[cols]
+        border_rows, first_reach = np.unique(rows[reach], return_index=True)
+        self._labels[border_rows] = self._labels[cols[reach][first_reach]]
+
+        for label in comp_label.tolist():
+            self._members[label] = []
+        for index, label in zip(core_members.tolist(), new_core_labels.tolist()):
+            self._members[label].append(index)
+        for index in border_rows.tolist():
+            self._members[int(self._labels[index])].append(index)
+
+    def summary(self) -> Dict[str, Any]:
+        active = self.active_mask
+        n_noise = int(np.count_nonzero(self.labels[active] == -1))
+        return {
+            'total_points': self._n_active,
+            'n_clusters': len(self._members),
+            'n_core_points': int(np.count_nonzero(self.core_mask & active)),
+            'n_noise_points': n_noise,
+            'noise_percentage': (n_noise / self._n_active) * 100 if self._n_active > 0 else 0
+        }
@@ -0,0 +1,275 @@
+import json
+import codecs
+import struct
+from typing import Dict, Any, Iterator, IO, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schema import REPORT_FIELDS, LATITUDE_FIELDS, LONGITUDE_FIELDS, to_float, decode_coordinates, decode_columns
+
+# Request body content types parsed one report at a time
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+CHUNK_SIZE = 64 * 1024
+
+# Typical encoded size of one report (production reports run 170-300 bytes), used to
+# presize the columns; smaller reports make the columns double once or twice instead
+# of every body reserving room for several times its report count
+TYPICAL_REPORT_BYTES = 256
+
+# Binary columnar bodies: Arrow IPC (needs pyarrow) and the packed format below
+ARROW_STREAM_MIMETYPES = ('application/vnd.apache.arrow.stream',)
+ARROW_FILE_MIMETYPES = ('application/vnd.apache.arrow.file',)
+PACKED_MIMETYPE = 'application/x-rcv-columns'
+
+# Packed column bodies are, little-endian:
+#   b'RCVC' | uint32 header length | UTF-8 JSON header | column buffers
+# The header is {"rows": n, "columns": [{"name": ..., "type": ...}, ...]}. Buffers
+# follow in header order, each starting on an 8-byte boundary of the body. Types are
+# float64/float32/int64/int32 (n values each) and "dictionary": n int32 codes into the
+# column's "values" string table, with -1 for a missing value.
+PACKED_MAGIC = b'RCVC'
+PACKED_ALIGNMENT = 8
+PACKED_TYPES = {
+    'float64': '<f8',
+    'float32': '<f4',
+    'int64': '<i8',
+    'int32': '<i4',
+    'dictionary': '<i4'
+}
+
+
+class ReportColumns:
+    # Columns filled one report at a time. Arrays start at a capacity estimated from
+    # the body size and double when full, so parsing never holds the decoded report
+    # list in memory. Only the coordinates and the schema fields are kept.
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(1, capacity)
+        self.size = 0
+        self.has_coordinates = False
+        self.latitude = np.empty(capacity, dtype=np.float64)
+        self.longitude = np.empty(capacity, dtype=np.float64)
+        self.columns = {name: np.empty(capacity, dtype=object) for name in REPORT_FIELDS}
+        self.present = set()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        capacity = len(self.latitude) * 2
+        self.latitude = np.resize(self.latitude, capacity)
+        self.longitude = np.resize(self.longitude, capacity)
+        for name, values in self.columns.items():
+            grown = np.empty(capacity, dtype=object)
+            grown[:self.size] = values[:self.size]
+            self.columns[name] = grown
+
+    def append(self, report: Dict[str, Any]) -> None:
+        if not isinstance(report, dict):
+            raise ValueError("Each report must be a JSON object")
+        if self.size == len(self.latitude):
+            self._grow()
+
+        index = self.size
+        lat = report.get('lat', report.get('latitude'))
+        lng = report.get('long', report.get('longitude'))
+        if lat is not None or lng is not None:
+            self.has_coordinates = True
+        self.latitude[index] = to_float(lat)
+        self.longitude[index] = to_float(lng)
+
+        for name, values in self.columns.items():
+            value = report.get(name)
+            values[index] = value
+            if value is not None:
+                self.present.add(name)
+        self.size += 1
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], size: int) -> 'ReportColumns':
+        # Wraps columns decoded in one piece from a binary body; fields other than the
+        # coordinates and the schema fields are dropped, as when parsing JSON
+        if any(len(values) != size for values in arrays.values()):
+            raise ValueError("All columns must have the same length")
+
+        columns = cls.__new__(cls)
+        columns.size = size
+        columns.latitude = _coordinate_column(arrays, LATITUDE_FIELDS, size)
+        columns.longitude = _coordinate_column(arrays, LONGITUDE_FIELDS, size)
+        columns.has_coordinates = any(name in arrays for name in LATITUDE_FIELDS + LONGITUDE_FIELDS)
+        columns.columns = {name: arrays[name] for name in REPORT_FIELDS if name in arrays}
+        columns.present = set(columns.columns)
+        return columns
+
+    def to_frame(self) -> pd.DataFrame:
+        # Typed columns per the report schema; fields that never appeared are left out
+        fields = {name: self.columns[name][:self.size] for name in REPORT_FIELDS if name in self.present}
+        return decode_columns(self.latitude[:self.size], self.longitude[:self.size], fields)
+
+
+def _coordinate_column(arrays: Dict[str, np.ndarray], names: Tuple[str, ...], size: int) -> np.ndarray:
+    for name in names:
+        if name in arrays:
+            return decode_coordinates(arrays[name])
+    return np.full(size, np.nan)
+
+
+def estimate_capacity(content_length: Optional[int]) -> int:
+    if not content_length:
+        return 1024
+    return int(min(max(content_length // TYPICAL_REPORT_BYTES, 1024), 10_000_000))
+
+
+def iter_ndjson(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    # Reads fixed-size chunks and splits lines itself; iterating a WSGI input stream
+    # line by line costs a read call per few bytes
+    line_number = 0
+    pending = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop() if chunk else b''
+        for line in lines:
+            line_number += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+        if not chunk:
+            return
+
+
+def iter_json_array(stream: IO[bytes], prefix: bytes = b'') -> Iterator[Dict[str, Any]]:
+    # Decodes one array element at a time from a buffer that only holds the unparsed
+    # tail of the body plus the latest chunk
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    state = {'buffer': utf8.decode(prefix), 'pos': 0, 'eof': False}
+
+    def read_more() -> None:
+        chunk = stream.read(CHUNK_SIZE)
+        state['eof'] = not chunk
+        state['buffer'] = state['buffer'][state['pos']:] + utf8.decode(chunk, final=state['eof'])
+        state['pos'] = 0
+
+    def next_char() -> str:
+        # Next non-whitespace character ('' at end of input), reading more as needed
+        while True:
+            buffer, pos = state['buffer'], state['pos']
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            state['pos'] = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if state['eof']:
+                return ''
+            read_more()
+
+    if next_char() != '[':
+        raise ValueError("Streamed JSON body must be an array of reports")
+    state['pos'] += 1
+    if next_char() == ']':
+        return
+
+    while True:
+        next_char()
+        while True:
+            try:
+                report, end = decoder.raw_decode(state['buffer'], state['pos'])
+                break
+            except json.JSONDecodeError as e:
+                if state['eof']:
+                    raise ValueError(f"Invalid JSON in report array: {e.msg}")
+                read_more()
+        state['pos'] = end
+        yield report
+
+        separator = next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError("Invalid JSON in report array: expected ',' or ']'")
+        state['pos'] += 1
+
+
+def peek_json_body(stream: IO[bytes]) -> Tuple[bytes, str]:
+    # Reads up to the first non-whitespace byte; returns the bytes consumed and that
+    # character so the caller can pick the array or the object parser
+    consumed = b''
+    while True:
+        chunk = stream.read(1024)
+        if not chunk:
+            return consumed, ''
+        consumed += chunk
+        stripped = consumed.lstrip()
+        if stripped:
+            return consumed, chr(stripped[0])
+
+
+def read_report_stream(reports: Iterator[Dict[str, Any]], capacity: int) -> ReportColumns:
+    columns = ReportColumns(capacity)
+    for report in reports:
+        columns.append(report)
+    return columns
+
+
+def read_packed_columns(body: bytes) -> ReportColumns:
+    # Buffers are wrapped with np.frombuffer, so numeric columns are used without copying
+    if len(body) < 8 or body[:4] != PACKED_MAGIC:
+        raise ValueError("Packed column body must start with the RCVC header")
+    (header_length,) = struct.unpack_from('<I', body, 4)
+    offset = 8 + header_length
+    if offset > len(body):
+        raise ValueError("Packed column header is truncated")
+    try:
+        header = json.loads(body[8:offset].decode('utf-8'))
+        rows = int(header['rows'])
+        specs = header['columns']
+        if rows < 0 or not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+            raise ValueError
+    except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid packed column header")
+
+    arrays = {}
+    for spec in specs:
+        name = spec.get('name')
+        kind = spec.get('type')
+        if kind not in PACKED_TYPES:
+            raise ValueError(f"Unsupported packed column type for {name}: {kind}")
+
+        offset += -offset % PACKED_ALIGNMENT
+        dtype = np.dtype(PACKED_TYPES[kind])
+        if offset + rows * dtype.itemsize > len(body):
+            raise ValueError(f"Packed column {name} is truncated")
+        values = np.frombuffer(body, dtype=dtype, count=rows, offset=offset)
+        offset += rows * dtype.itemsize
+
+        if kind == 'dictionary':
+            table = list(spec.get('values', []))
+            if rows and (values.min() < -1 or values.max() >= len(table)):
+                raise ValueError(f"Dictionary code out of range in column {name}")
+            if len(set(map(str, table))) == len(table):
+                # Codes become a categorical as they are, without re-hashing the strings
+                values = pd.Categorical.from_codes(values, categories=table)
+            else:
+                values = np.array(table + [None], dtype=object)[values]  # code -1 picks None
+        arrays[name] = values
+    return ReportColumns.from_arrays(arrays, rows)
+
+
+def read_arrow_columns(body: bytes, file_format: bool = False) -> ReportColumns:
+    # Arrow support is optional; ImportError is left to the caller to report
+    import pyarrow as pa
+
+    reader = pa.ipc.open_file(body) if file_format else pa.ipc.open_stream(body)
+    table = reader.read_all()
+    arrays = {}
+    for name in table.column_names:
+        if name in LATITUDE_FIELDS or name in LONGITUDE_FIELDS or name in REPORT_FIELDS:
+            arrays[name] = table.column(name).to_numpy(zero_copy_only=False)
+    return ReportColumns.from_arrays(arrays, table.num_rows)
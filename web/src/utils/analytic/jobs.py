@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Pipeline stages reported while an analysis job runs, in order
+JOB_STAGES = ('load', 'preprocess', 'collapse', 'neighbors', 'cluster', 'stats', 'boundaries', 'pyramid')
+
+# Where job status and result files live, and how long they are kept
+JOB_DIR = os.environ.get('ANALYTICS_JOB_DIR', os.path.join(tempfile.gettempdir(), 'rcv-analytics-jobs'))
+JOB_TTL_SECONDS = float(os.environ.get('ANALYTICS_JOB_TTL_SECONDS', str(24 * 60 * 60)))
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobStore:
+    # Analysis jobs kept as JSON files on local disk: <id>.json holds status and stage
+    # progress, <id>.result.json the final response body. Files are replaced
+    # atomically, so the server process and clustering workers can both update a job.
+
+    def __init__(self, directory: str = JOB_DIR, ttl_seconds: float = JOB_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str, suffix: str = '.json') -> str:
+        if not JOB_ID_PATTERN.match(job_id):
+            raise ValueError("Invalid job id")
+        return os.path.join(self.directory, job_id + suffix)
+
+    def _write(self, path: str, payload: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(payload, handle, default=str)
+        os.replace(tmp_path, path)
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def create(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        self.purge_expired()
+        now = time.time()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
+            'parameters': parameters,
+            'stages': {stage: 'pending' for stage in JOB_STAGES},
+            'current_stage': None,
+            'progress_percent': 0.0,
+            'error': None,
+            'created_at': datetime.fromtimestamp(now).isoformat(),
+            'updated_at': datetime.fromtimestamp(now).isoformat(),
+            'expires_at': now + self.ttl_seconds
+        }
+        self._write(self._path(job['job_id']), job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._read(self._path(job_id))
+        if job is not None and job['expires_at'] < time.time():
+            self.delete(job_id)
+            return None
+        return job
+
+    def update(self, job_id: str, **fields) -> None:
+        job = self._read(self._path(job_id))
+        if job is None:
+            return
+        job.update(fields)
+        job['updated_at'] = datetime.now().isoformat()
+        self._write(self._path(job_id), job)
+
+    def set_stage(self, job_id: str, stage: str, state: str) -> None:
+        job = self._read(self._path(job_id))
+        if job is None:
+            return
+        job['stages'][stage] = state
+        job['status'] = 'running'
+        job['current_stage'] = stage if state == 'running' else job['current_stage']
+        done = sum(1 for value in job['stages'].values() if value in ('completed', 'skipped'))
+        job['progress_percent'] = round(done / len(job['stages']) * 100, 1)
+        job['updated_at'] = datetime.now().isoformat()
+        self._write(self._path(job_id), job)
+
+    def save_result(self, job_id: str, body: Dict[str, Any]) -> None:
+        self._write(self._path(job_id, '.result.json'), body)
+        job = self._read(self._path(job_id)) or {}
+        stages = {stage: ('completed' if state == 'completed' else 'skipped')
+                  for stage, state in job.get('stages', {}).items()}
+        self.update(job_id, status='completed', stages=stages, current_stage=None, progress_percent=100.0)
+
+    def load_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._read(self._path(job_id, '.result.json'))
+
+    def fail(self, job_id: str, error: Dict[str, Any]) -> None:
+        self.update(job_id, status='failed', error=error)
+
+    def delete(self, job_id: str) -> None:
+        for suffix in ('.json', '.result.json'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge_expired(self) -> None:
+        now = time.time()
+        for name in os.listdir(self.directory):
+            job_id = name.split('.', 1)[0]
+            if not name.endswith('.json') or name.endswith('.result.json') or not JOB_ID_PATTERN.match(job_id):
+                continue
+            job = self._read(os.path.join(self.directory, name))
+            if job is not None and job['expires_at'] < now:
+                self.delete(job_id)
+
+
+class JobProgress:
+    # Picklable progress callback for AnalyticsProcessor: records stage transitions in
+    # the job store from whichever process runs the stage
+
+    def __init__(self, directory: str, job_id: str):
+        self.directory = directory
+        self.job_id = job_id
+
+    def __call__(self, stage: str, state: str) -> None:
+        if stage in JOB_STAGES:
+            JobStore(self.directory).set_stage(self.job_id, stage, state)
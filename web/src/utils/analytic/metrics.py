@@ -0,0 +1,94 @@
+import bisect
+import sys
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (seconds) of the latency buckets, from cache hits to large analyses
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def format_sample(name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> str:
+    return f"{name}{format_labels(labels or {})} {float(value)!r}"
+
+
+def format_gauge(name: str, help_text: str, value: float, kind: str = 'gauge') -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", format_sample(name, value)]
+
+
+class Histogram:
+    # Thread-safe Prometheus histogram with one series per label combination
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, with +Inf last; sum of observations)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(format_sample(f"{self.name}_bucket", cumulative, {**labels, 'le': le}))
+            lines.append(format_sample(f"{self.name}_sum", total, labels))
+            lines.append(format_sample(f"{self.name}_count", cumulative, labels))
+        return lines
+
+
+def reset_peak_rss() -> bool:
+    # Restarts the process's peak RSS (VmHWM) from its current RSS; Linux only. The
+    # peak is per process, so threads serving other requests share it.
+    try:
+        with open('/proc/self/clear_refs', 'w') as handle:
+            handle.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    # Peak RSS since the last reset_peak_rss() on Linux, else since process start
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
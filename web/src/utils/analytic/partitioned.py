@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.neighbors import BallTree
+
+from geodesy import EARTH_RADIUS_KM, haversine_km
+
+# Below this many points the partitions are clustered in-process; a pool costs more
+# to start than it saves
+MIN_POINTS_FOR_POOL = 20000
+
+
+def _grid_partitions(lat_deg: np.ndarray, lon_deg: np.ndarray, n_partitions: int) -> np.ndarray:
+    # Latitude bands split at quantiles, each band split at its own longitude quantiles,
+    # so cells hold similar numbers of points even when reports are concentrated
+    n_rows = max(1, int(np.ceil(np.sqrt(n_partitions))))
+    n_cols = max(1, int(np.ceil(n_partitions / n_rows)))
+
+    lat_edges = np.quantile(lat_deg, np.linspace(0, 1, n_rows + 1)[1:-1])
+    rows = np.searchsorted(lat_edges, lat_deg, side='right')
+
+    cells = np.empty(len(lat_deg), dtype=np.int64)
+    for row in range(n_rows):
+        in_row = rows == row
+        if not in_row.any():
+            continue
+        lon_edges = np.quantile(lon_deg[in_row], np.linspace(0, 1, n_cols + 1)[1:-1])
+        cells[in_row] = row * n_cols + np.searchsorted(lon_edges, lon_deg[in_row], side='right')
+    return cells
+
+
+def _halo_mask(lat_deg: np.ndarray, lon_deg: np.ndarray, owned: np.ndarray, eps_km: float) -> np.ndarray:
+    # Every point that can be within eps_km of a point in the owned cell's bounding box
+    eps_rad = (eps_km / EARTH_RADIUS_KM) * (1 + 1e-9)
+    dlat = np.degrees(eps_rad)
+    lat_min = lat_deg[owned].min() - dlat
+    lat_max = lat_deg[owned].max() + dlat
+
+    # Widest longitude gap at eps from the haversine bound at the band's highest latitude
+    cos_lat = np.cos(np.radians(min(90.0, max(abs(lat_min), abs(lat_max)))))
+    if cos_lat <= np.sin(eps_rad / 2):
+        dlon = 360.0
+    else:
+        dlon = np.degrees(2 * np.arcsin(np.sin(eps_rad / 2) / cos_lat))
+    lon_min = lon_deg[owned].min() - dlon
+    lon_max = lon_deg[owned].max() + dlon
+
+    in_lat = (lat_deg >= lat_min) & (lat_deg <= lat_max)
+    in_lon = np.zeros(len(lon_deg), dtype=bool)
+    for shift in (-360.0, 0.0, 360.0):  # the box may wrap around the antimeridian
+        shifted = lon_deg + shift
+        in_lon |= (shifted >= lon_min) & (shifted <= lon_max)
+    return in_lat & in_lon & ~owned
+
+
+def _cluster_partition(owned_idx: np.ndarray, halo_idx: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                       weights: np.ndarray, eps_km: float, min_samples: float) -> Dict[str, np.ndarray]:
+    # Runs in a worker process. lat/lon/weights hold the owned points followed by the
+    # halo, all in radians. Owned points see their full neighborhood, so their core
+    # flags are exact; links into the halo are returned for the merge step.
+    n_owned = len(owned_idx)
+    global_idx = np.concatenate([owned_idx, halo_idx])
+    coords = np.column_stack([lat, lon])
+
+    tree = BallTree(coords, metric='haversine')
+    neighbors = tree.query_radius(coords[:n_owned], r=(eps_km / EARTH_RADIUS_KM) * (1 + 1e-9))
+    counts = np.fromiter((len(idx) for idx in neighbors), dtype=np.int64, count=n_owned)
+    rows = np.repeat(np.arange(n_owned), counts)
+    cols = np.concatenate(neighbors).astype(np.int64, copy=False) if n_owned else np.empty(0, dtype=np.int64)
+
+    within = haversine_km(lat[rows], lon[rows], lat[cols], lon[cols]) <= eps_km
+    rows = rows[within]
+    cols = cols[within]
+
+    neighbor_weight = np.bincount(rows, weights=weights[cols], minlength=n_owned)
+    core = neighbor_weight >= min_samples
+
+    # Connected components among owned core points, named by their lowest global index
+    local = (cols < n_owned) & core[rows] & core[np.minimum(cols, n_owned - 1)]
+    graph = sparse.csr_matrix((np.ones(np.count_nonzero(local), dtype=np.int8),
+                               (rows[local], cols[local])), shape=(n_owned, n_owned))
+    _, component = connected_components(graph, directed=False)
+    representative = np.full(n_owned, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(representative, component, owned_idx)
+    representative = np.where(core, representative[component], -1)
+
+    # Core-to-halo links decide merges across borders; non-core points keep all their
+    # (few) neighbors so borders can be resolved once global core flags are known
+    cross = core[rows] & (cols >= n_owned)
+    border = ~core[rows] & (rows != cols)
+    return {
+        'owned': owned_idx,
+        'core': core,
+        'representative': representative,
+        'cross_from': owned_idx[rows[cross]],
+        'cross_to': global_idx[cols[cross]],
+        'border_from': owned_idx[rows[border]],
+        'border_to': global_idx[cols[border]],
+    }
+
+
+def partitioned_dbscan(coordinates: np.ndarray, eps_km: float, min_samples: int,
+                       sample_weight: Optional[np.ndarray] = None,
+                       max_workers: Optional[int] = None,
+                       n_partitions: Optional[int] = None) -> np.ndarray:
+    # Labels identical to DBSCAN(metric='precomputed') over haversine distances:
+    # clusters are numbered by their lowest core index and a border point joins the
+    # lowest-numbered cluster among its core neighbors, as sklearn's serial scan does
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    n = len(coordinates)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    weights = np.ones(n) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    max_workers = min(max_workers or os.cpu_count() or 1, os.cpu_count() or 1)
+    n_partitions = max(1, min(n_partitions or max_workers, n))
+
+    lat_deg = coordinates[:, 0]
+    lon_deg = coordinates[:, 1]
+    lat_rad = np.radians(lat_deg)
+    lon_rad = np.radians(lon_deg)
+    cells = _grid_partitions(lat_deg, lon_deg, n_partitions)
+
+    tasks: List[Tuple[Any, ...]] = []
+    for cell in np.unique(cells):
+        owned = cells == cell
+        owned_idx = np.flatnonzero(owned)
+        halo_idx = np.flatnonzero(_halo_mask(lat_deg, lon_deg, owned, eps_km))
+        local = np.concatenate([owned_idx, halo_idx])
+        tasks.append((owned_idx, halo_idx, lat_rad[local], lon_rad[local], weights[local],
+                      eps_km, min_samples))
+
+    if len(tasks) > 1 and max_workers > 1 and n >= MIN_POINTS_FOR_POOL:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+            parts = list(pool.map(_cluster_partition, *zip(*tasks)))
+    else:
+        parts = [_cluster_partition(*task) for task in tasks]
+
+    core = np.zeros(n, dtype=bool)
+    representative = np.full(n, -1, dtype=np.int64)
+    for part in parts:
+        core[part['owned']] = part['core']
+        representative[part['owned']] = part['representative']
+
+    # Global components over core points: each core links to its partition-local
+    # representative, plus every core-to-core link that crosses a partition border
+    cross_from = np.concatenate([part['cross_from'] for part in parts])
+    cross_to = np.concatenate([part['cross_to'] for part in parts])
+    keep = core[cross_to]
+    core_idx = np.flatnonzero(core)
+    edge_from = np.concatenate([core_idx, cross_from[keep]])
+    edge_to = np.concatenate([representative[core_idx], cross_to[keep]])
+    graph = sparse.csr_matrix((np.ones(len(edge_from), dtype=np.int8), (edge_from, edge_to)), shape=(n, n))
+    _, component = connected_components(graph, directed=False)
+
+    # Number clusters in order of their lowest core index
+    labels = np.full(n, -1, dtype=np.int64)
+    if len(core_idx):
+        core_component = component[core_idx]
+        first_core = np.full(component.max() + 1, n, dtype=np.int64)
+        np.minimum.at(first_core, core_component, core_idx)
+        used = np.flatnonzero(first_core < n)
+        mapping = np.full(component.max() + 1, -1, dtype=np.int64)
+        mapping[used[np.argsort(first_core[used])]] = np.arange(len(used))
+        labels[core_idx] = mapping[core_component]
+
+    # Border points take the lowest cluster label among their core neighbors
+    border_from = np.concatenate([part['border_from'] for part in parts])
+    border_to = np.concatenate([part['border_to'] for part in parts])
+    reach = core[border_to]
+    if reach.any():
+        best = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(best, border_from[reach], labels[border_to[reach]])
+        is_border = best < np.iinfo(np.int64).max
+        labels[is_border] = best[is_border]
+
+    return labels
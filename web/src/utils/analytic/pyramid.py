@@ -0,0 +1,198 @@
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Web Mercator tiles are TILE_SIZE pixels wide; aggregates cover square grid cells of
+# CELL_PIXELS on screen, so a 1024 x 768 view shows at most a couple hundred cells
+TILE_SIZE = 256
+CELL_PIXELS = 64
+PYRAMID_MAX_ZOOM = 16
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+# Features returned per query at most; the largest aggregates are kept
+MAX_PYRAMID_FEATURES = 2000
+
+
+def mercator_x(longitudes: np.ndarray) -> np.ndarray:
+    # Longitude to the [0, 1] world coordinate of Web Mercator, 0 at the antimeridian
+    return np.clip(np.asarray(longitudes, dtype=np.float64), -180.0, 180.0) / 360.0 + 0.5
+
+
+def mercator_y(latitudes: np.ndarray) -> np.ndarray:
+    # Latitude to the [0, 1] world coordinate of Web Mercator, 0 at the north edge
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=np.float64), -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    return 0.5 - np.log(np.tan(np.pi / 4 + lat / 2)) / (2 * np.pi)
+
+
+def grid_size(zoom: int) -> int:
+    # Cells per axis at a zoom level; each level splits every cell of the one above in four
+    return (TILE_SIZE // CELL_PIXELS) << zoom
+
+
+def aggregate_level(keys: np.ndarray, lat_sum: np.ndarray, lng_sum: np.ndarray, count: np.ndarray,
+                    noise: np.ndarray, pair_keys: np.ndarray, pair_labels: np.ndarray,
+                    pair_counts: np.ndarray) -> Tuple[Dict[str, np.ndarray], Tuple[np.ndarray, ...]]:
+    # Sums per cell key (sorted), plus the (cell, cluster) member counts the dominant
+    # cluster of each cell is chosen from
+    cells, inverse = np.unique(keys, return_inverse=True)
+    level = {
+        'key': cells,
+        'lat_sum': np.bincount(inverse, weights=lat_sum, minlength=len(cells)),
+        'lng_sum': np.bincount(inverse, weights=lng_sum, minlength=len(cells)),
+        'count': np.bincount(inverse, weights=count, minlength=len(cells)).astype(np.int64),
+        'noise': np.bincount(inverse, weights=noise, minlength=len(cells)).astype(np.int64)
+    }
+
+    pairs, pair_inverse = np.unique(np.column_stack([pair_keys, pair_labels]), axis=0, return_inverse=True)
+    counts = np.bincount(pair_inverse.ravel(), weights=pair_counts, minlength=len(pairs)).astype(np.int64)
+    # Largest cluster per cell, ties to the lowest cluster id
+    order = np.lexsort((pairs[:, 1], -counts, pairs[:, 0]))
+    first = order[np.r_[True, pairs[order[1:], 0] != pairs[order[:-1], 0]]]
+    level['cluster'] = np.full(len(cells), -1, dtype=np.int64)
+    level['cluster'][np.searchsorted(cells, pairs[first, 0])] = pairs[first, 1]
+    return level, (pairs[:, 0], pairs[:, 1], counts)
+
+
+class ZoomPyramid:
+    # Grid aggregates of the reports of one clustering run for zoom levels 0..max_zoom,
+    # like a supercluster index: every level merges the cells of the level below in
+    # groups of four, so aggregate counts are consistent across zooms. Each aggregate
+    # keeps its report count, centroid, noise count and the cluster most of its
+    # reports belong to. Above max_zoom individual reports are returned.
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, labels: np.ndarray,
+                 report_index: Optional[np.ndarray] = None, max_zoom: int = PYRAMID_MAX_ZOOM):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.int64)
+        self.max_zoom = max_zoom
+        self.n_points = len(latitudes)
+
+        # Reports sorted by Web Mercator x for bbox queries above max_zoom
+        x = mercator_x(longitudes)
+        y = mercator_y(latitudes)
+        order = np.argsort(x, kind='stable')
+        self.points = {
+            'x': x[order],
+            'y': y[order],
+            'lat': latitudes[order],
+            'lng': longitudes[order],
+            'cluster': labels[order],
+            'index': (np.arange(len(latitudes)) if report_index is None else np.asarray(report_index))[order]
+        }
+
+        # Finest level from the reports, coarser levels from the level below
+        self.levels: Dict[int, Dict[str, np.ndarray]] = {}
+        size = grid_size(max_zoom)
+        cell_x = np.minimum((x * size).astype(np.int64), size - 1)
+        cell_y = np.minimum((y * size).astype(np.int64), size - 1)
+        keys = cell_x * size + cell_y
+        ones = np.ones(len(keys))
+        level, pairs = aggregate_level(keys, latitudes, longitudes, ones, (labels < 0).astype(np.float64),
+                                       keys, labels, ones)
+        self.levels[max_zoom] = level
+        for zoom in range(max_zoom - 1, -1, -1):
+            child_size = grid_size(zoom + 1)
+            parent_keys = (level['key'] // child_size // 2) * (child_size // 2) + (level['key'] % child_size) // 2
+            pair_parent = (pairs[0] // child_size // 2) * (child_size // 2) + (pairs[0] % child_size) // 2
+            level, pairs = aggregate_level(parent_keys, level['lat_sum'], level['lng_sum'], level['count'],
+                                           level['noise'], pair_parent, pairs[1], pairs[2])
+            self.levels[zoom] = level
+
+        for level in self.levels.values():
+            level['lat'] = level.pop('lat_sum') / level['count']
+            level['lng'] = level.pop('lng_sum') / level['count']
+
+    @property
+    def nbytes(self) -> int:
+        arrays = list(self.points.values()) + [values for level in self.levels.values() for values in level.values()]
+        return sum(values.nbytes for values in arrays)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'max_zoom': self.max_zoom,
+            'total_points': self.n_points,
+            'aggregates_per_zoom': {zoom: len(self.levels[zoom]['key']) for zoom in sorted(self.levels)}
+        }
+
+    def query(self, west: float, south: float, east: float, north: float, zoom: float,
+              limit: int = MAX_PYRAMID_FEATURES) -> Dict[str, Any]:
+        # GeoJSON FeatureCollection of the aggregates (or reports, above max_zoom) whose
+        # cell intersects the bbox; a bbox with west > east crosses the antimeridian
+        zoom = int(np.clip(np.floor(zoom), 0, self.max_zoom + 1))
+        if west <= east:
+            x_ranges = [(float(mercator_x(west)), float(mercator_x(east)))]
+        else:
+            x_ranges = [(float(mercator_x(west)), 1.0), (0.0, float(mercator_x(east)))]
+        y_top, y_bottom = float(mercator_y(north)), float(mercator_y(south))
+
+        if zoom > self.max_zoom:
+            features, total = self._query_points(x_ranges, y_top, y_bottom, limit)
+        else:
+            features, total = self._query_level(zoom, x_ranges, y_top, y_bottom, limit)
+        return {
+            'type': 'FeatureCollection',
+            'zoom': zoom,
+            'total_features': total,
+            'truncated': total > len(features),
+            'features': features
+        }
+
+    def _query_level(self, zoom: int, x_ranges: List[Tuple[float, float]], y_top: float, y_bottom: float,
+                     limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        level = self.levels[zoom]
+        size = grid_size(zoom)
+        row_lo, row_hi = int(y_top * size), min(int(y_bottom * size), size - 1)
+
+        # Keys are sorted by cell column first, so each column range is one slice
+        selected = []
+        for x_lo, x_hi in x_ranges:
+            col_lo, col_hi = int(x_lo * size), min(int(x_hi * size), size - 1)
+            start, stop = np.searchsorted(level['key'], [col_lo * size, (col_hi + 1) * size])
+            rows = level['key'][start:stop] % size
+            selected.append(start + np.flatnonzero((rows >= row_lo) & (rows <= row_hi)))
+        selected = np.concatenate(selected)
+        total = len(selected)
+        if total > limit:
+            selected = selected[np.argsort(-level['count'][selected], kind='stable')[:limit]]
+
+        features = []
+        for i in selected.tolist():
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [float(level['lng'][i]), float(level['lat'][i])]},
+                'properties': {
+                    'aggregate': True,
+                    'point_count': int(level['count'][i]),
+                    'noise_count': int(level['noise'][i]),
+                    'cluster_id': int(level['cluster'][i])
+                }
+            })
+        return features, total
+
+    def _query_points(self, x_ranges: List[Tuple[float, float]], y_top: float, y_bottom: float,
+                      limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        points = self.points
+        selected = []
+        for x_lo, x_hi in x_ranges:
+            start = np.searchsorted(points['x'], x_lo, side='left')
+            stop = np.searchsorted(points['x'], x_hi, side='right')
+            y = points['y'][start:stop]
+            selected.append(start + np.flatnonzero((y >= y_top) & (y <= y_bottom)))
+        selected = np.concatenate(selected)
+        total = len(selected)
+        selected = selected[:limit]
+
+        features = []
+        for i in selected.tolist():
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [float(points['lng'][i]), float(points['lat'][i])]},
+                'properties': {
+                    'aggregate': False,
+                    'point_count': 1,
+                    'cluster_id': int(points['cluster'][i]),
+                    'input_index': int(points['index'][i])
+                }
+            })
+        return features, total
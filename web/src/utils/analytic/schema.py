@@ -0,0 +1,81 @@
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Report fields the analysis reads besides the coordinates, and the column type each
+# one is decoded to. Any other field (remarks, images, ...) is dropped on load.
+#   object     - kept as given (report ids may be strings or numbers)
+#   category   - few distinct values repeated across many reports
+#   datetime64 - ISO 8601 timestamps, normalized to UTC; unparseable values become NaT
+REPORT_SCHEMA = {
+    '_id': 'object',
+    'product': 'category',
+    'scannedBy': 'category',
+    'scanResult': 'category',
+    'scannedAt': 'datetime64'
+}
+REPORT_FIELDS = tuple(REPORT_SCHEMA)
+
+# Coordinates are decoded from 'lat'/'long', falling back to 'latitude'/'longitude'
+COORDINATE_DTYPE = np.float64
+LATITUDE_FIELDS = ('lat', 'latitude')
+LONGITUDE_FIELDS = ('long', 'longitude')
+
+
+def to_float(value: Any) -> float:
+    # Same coercion as pd.to_numeric(errors='coerce'): unparseable values become NaN
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def decode_coordinates(values: Sequence[Any]) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        return values.astype(COORDINATE_DTYPE, copy=False)
+    try:
+        # Numbers and numeric strings convert in one C loop
+        return np.array(values, dtype=COORDINATE_DTYPE)
+    except (TypeError, ValueError):
+        return np.fromiter((to_float(value) for value in values), dtype=COORDINATE_DTYPE, count=len(values))
+
+
+def decode_field(values: Sequence[Any], kind: str) -> Any:
+    if kind == 'category':
+        return pd.Categorical(values)
+    if kind == 'datetime64':
+        return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True, format='ISO8601').array
+    return np.asarray(values, dtype=object)
+
+
+def decode_columns(latitude: Sequence[Any], longitude: Sequence[Any], fields: Dict[str, Sequence[Any]]) -> pd.DataFrame:
+    # DataFrame with float coordinates followed by the schema fields that are present
+    columns = {
+        'latitude': decode_coordinates(latitude),
+        'longitude': decode_coordinates(longitude)
+    }
+    for name, kind in REPORT_SCHEMA.items():
+        if name in fields:
+            columns[name] = decode_field(fields[name], kind)
+    return pd.DataFrame(columns, copy=False)
+
+
+def decode_reports(reports: List[Dict[str, Any]]) -> pd.DataFrame:
+    # One pass per declared field over the report dicts; no intermediate DataFrame of
+    # every submitted field is built
+    if not all(isinstance(report, dict) for report in reports):
+        raise ValueError("Each report must be a JSON object")
+    if not any(any(name in report for name in LATITUDE_FIELDS + LONGITUDE_FIELDS) for report in reports):
+        raise ValueError("Data must contain 'lat'/'long' or 'latitude'/'longitude' columns")
+
+    latitude = [report.get('lat', report.get('latitude')) for report in reports]
+    longitude = [report.get('long', report.get('longitude')) for report in reports]
+    fields = {}
+    for name in REPORT_FIELDS:
+        values = [report.get(name) for report in reports]
+        if any(value is not None for value in values):
+            fields[name] = values
+    return decode_columns(latitude, longitude, fields)
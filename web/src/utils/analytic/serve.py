@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import signal
+import threading
+import time
+
+from waitress import wasyncore
+from waitress.server import create_server
+from werkzeug.wsgi import ClosingIterator
+
+import api
+
+
+class InFlightRequests:
+    # WSGI middleware counting requests whose response has not been fully sent,
+    # so shutdown can wait for them to drain
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _finished(self) -> None:
+        with self._lock:
+            self.count -= 1
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), [self._finished])
+        except BaseException:
+            self._finished()
+            raise
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Production server for the DBSCAN Geospatial Analytics API")
+    parser.add_argument('--host', default=os.environ.get('ANALYTICS_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('ANALYTICS_PORT', '5000')))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('ANALYTICS_THREADS', '8')),
+                        help="Request-handling threads")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('ANALYTICS_POOL_WORKERS', str(os.cpu_count() or 1))),
+                        help="Clustering worker processes")
+    parser.add_argument('--max-pending', type=int, default=int(os.environ.get('ANALYTICS_POOL_MAX_PENDING', '8')),
+                        help="Clustering jobs allowed to wait for a worker before requests get 503")
+    parser.add_argument('--timeout', type=float, default=float(os.environ.get('ANALYTICS_REQUEST_TIMEOUT', '120')),
+                        help="Seconds a request waits for its clustering job before getting 504")
+    parser.add_argument('--drain-timeout', type=float, default=float(os.environ.get('ANALYTICS_DRAIN_TIMEOUT', '30')),
+                        help="Seconds to let in-flight requests finish on shutdown")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    api.configure_clustering_pool(args.workers, args.max_pending, args.timeout)
+    app = InFlightRequests(api.app)
+    socket_map = {}
+    server = create_server(app, map=socket_map, host=args.host, port=args.port, threads=args.threads)
+
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    print("🚀 Starting DBSCAN Geospatial Analytics API (production)...")
+    print(f"📡 Listening on {args.host}:{args.port} with {args.threads} threads, "
+          f"{args.workers} clustering workers")
+
+    try:
+        while not stopping.is_set():
+            wasyncore.loop(timeout=1.0, map=socket_map, count=1)
+
+        # Graceful shutdown: stop accepting connections and let in-flight requests,
+        # including running analyses, finish within the drain timeout
+        print("🛑 Shutting down, draining in-flight requests...")
+        server.accepting = False
+        deadline = time.monotonic() + args.drain_timeout
+        while app.count > 0 and time.monotonic() < deadline:
+            wasyncore.loop(timeout=0.5, map=socket_map, count=1)
+    finally:
+        server.task_dispatcher.shutdown()
+        api.shutdown_job_executor()
+        api.shutdown_clustering_pool()
+        server.close()
+        print("✓ Server stopped")
+
+
+if __name__ == '__main__':
+    main()
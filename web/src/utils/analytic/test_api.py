@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def clustering_pool():
+    pool = api.ClusteringPool(max_workers=1, max_pending=1, timeout_seconds=60)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_recovers_from_a_dead_worker(clustering_pool):
+    with pytest.raises(api.ClusteringBusyError):
+        clustering_pool.run(os._exit, 1)
+    assert clustering_pool.run(pow, 2, 10) == 1024
+    assert clustering_pool.in_flight == 0
+
+
+@pytest.mark.parametrize('body, message', [
+    ([{'dataset_id': 'a'}], 'JSON object'),
+    ({'dataset_id': 'a', 'reports': [], 'parameters': []}, 'parameters'),
+    ({'dataset_id': 'a', 'reports': [], 'parameters': {'eps_km': 'x'}}, 'eps_km'),
+    ({'dataset_id': 'a', 'reports': [], 'parameters': {'eps_km': True}}, 'eps_km'),
+    ({'dataset_id': 'a', 'reports': [], 'parameters': {'min_samples': 2.5}}, 'min_samples')
+])
+def test_incremental_rejects_invalid_requests(body, message):
+    response = api.app.test_client().post('/v1/analyze/incremental', json=body)
+    assert response.status_code == 400
+    assert message in (response.get_json().get('message') or response.get_json()['error'])
+
+
+def test_n_jobs_must_be_a_positive_integer_and_is_capped():
+    for n_jobs in ('abc', 0, 2.5, True):
+        with pytest.raises(ValueError, match='n_jobs'):
+            api.parse_analysis_parameters({'n_jobs': n_jobs})
+    assert api.parse_analysis_parameters({'n_jobs': 10000})['n_jobs'] == (os.cpu_count() or 1)
+    assert api.parse_analysis_parameters({})['n_jobs'] is None
+
+
+@pytest.mark.parametrize('pyramid_max_zoom', ['3', 2.5, -1, True, 21])
+def test_pyramid_max_zoom_must_be_an_integer_in_range(pyramid_max_zoom):
+    with pytest.raises(ValueError, match='pyramid_max_zoom'):
+        api.parse_analysis_parameters({'pyramid_max_zoom': pyramid_max_zoom, 'zoom_pyramid': True})
+
+
+@pytest.mark.parametrize('boundary_max_vertices', ['x', 3.5, 2, False])
+def test_boundary_max_vertices_must_be_an_integer_of_at_least_three(boundary_max_vertices):
+    with pytest.raises(ValueError, match='boundary_max_vertices'):
+        api.parse_analysis_parameters({'boundary_max_vertices': boundary_max_vertices})
+
+
+@pytest.mark.parametrize('max_eps_km', ['x', True, -1])
+def test_max_eps_km_must_be_a_positive_number(max_eps_km):
+    with pytest.raises(ValueError, match='max_eps_km must be a positive number'):
+        api.parse_analysis_parameters({'max_eps_km': max_eps_km, 'clustering_mode': 'optics'})
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from conftest import EPS_KM, MIN_SAMPLES, assert_same_partition, core_mask, reference_dbscan
+from engine import AnalyticsProcessor
+from hierarchy import hierarchy_labels
+
+
+@pytest.fixture(scope='module')
+def hierarchy(coordinates):
+    processor = AnalyticsProcessor()
+    processor.data = pd.DataFrame({'latitude': coordinates[:, 0], 'longitude': coordinates[:, 1]})
+    return processor.compute_density_hierarchy(min_samples=MIN_SAMPLES, max_eps_km=2 * EPS_KM)
+
+
+@pytest.mark.parametrize('eps_km', [EPS_KM / 2, EPS_KM, 2 * EPS_KM])
+def test_hierarchy_cut_matches_precomputed_dbscan(coordinates, hierarchy, eps_km):
+    # Core points get DBSCAN's clusters; border points may join either neighbor cluster
+    labels = hierarchy_labels(hierarchy, eps_km)[hierarchy['point_index']]
+    reference = reference_dbscan(coordinates, eps_km)
+    core = core_mask(reference)
+    assert_same_partition(labels[core], reference.labels_[core])
+    assert (labels[reference.labels_ == -1] == -1).all()
+
+
+def test_hierarchy_cut_rejects_eps_beyond_its_radius(hierarchy):
+    processor = AnalyticsProcessor()
+    with pytest.raises(ValueError, match='max_eps_km'):
+        processor.cluster_from_hierarchy(hierarchy, 3 * EPS_KM)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from conftest import EPS_KM, MIN_SAMPLES, assert_same_partition, core_mask, reference_dbscan
+from incremental import IncrementalDBSCAN, BATCH_QUERY_MIN_POINTS
+
+
+def test_reference_has_clusters_borders_and_noise(coordinates):
+    # The shared dataset exercises every kind of point
+    reference = reference_dbscan(coordinates)
+    labels = reference.labels_
+    assert labels.max() >= 2
+    assert np.any(labels == -1)
+    assert np.any((labels >= 0) & ~core_mask(reference))
+
+
+def test_inserts_match_precomputed_dbscan(coordinates):
+    # Border points reachable from two clusters may join either, so cores are compared
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    for start in range(0, len(coordinates), 60):
+        model.insert(coordinates[start:start + 60, 0], coordinates[start:start + 60, 1])
+
+    reference = reference_dbscan(coordinates)
+    core = core_mask(reference)
+    np.testing.assert_array_equal(model.core_mask, core)
+    np.testing.assert_array_equal(model.labels == -1, reference.labels_ == -1)
+    assert_same_partition(model.labels[core], reference.labels_[core])
+
+
+def test_insert_reports_every_changed_label(coordinates):
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    half = len(coordinates) // 2
+    model.insert(coordinates[:half, 0], coordinates[:half, 1])
+    before = model.labels.copy()
+    changed = model.insert(coordinates[half:, 0], coordinates[half:, 1])
+
+    moved = set(np.flatnonzero(model.labels[:half] != before).tolist())
+    assert moved | set(range(half, len(coordinates))) == set(changed)
+    assert all(model.labels[index] == label for index, label in changed.items())
+
+
+def test_cluster_ids_survive_later_inserts(coordinates):
+    # Merges relabel the smaller cluster into the larger one, so the largest cluster
+    # keeps its id and its points as later batches grow it
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    half = len(coordinates) // 2
+    model.insert(coordinates[:half, 0], coordinates[:half, 1])
+    largest = np.bincount(model.labels[model.labels >= 0]).argmax()
+    members = np.flatnonzero(model.labels == largest)
+    model.insert(coordinates[half:, 0], coordinates[half:, 1])
+    assert (model.labels[members] == largest).all()
+
+
+def test_batch_neighborhoods_match_point_lookups(coordinates):
+    # Batches of BATCH_QUERY_MIN_POINTS or more take the k-d tree path over the
+    # surrounding grid cells; it must find exactly the per-point neighborhoods
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    model.insert(coordinates[:, 0], coordinates[:, 1])
+    batch = np.arange(BATCH_QUERY_MIN_POINTS + 10)
+    neighborhoods = model._neighborhoods(batch)
+    for index in batch.tolist():
+        np.testing.assert_array_equal(neighborhoods[index], np.sort(model._neighbors(index)))
+
+
+def test_large_batch_inserts_match_precomputed_dbscan(coordinates):
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    split = len(coordinates) - BATCH_QUERY_MIN_POINTS - 10
+    model.insert(coordinates[:split, 0], coordinates[:split, 1])
+    model.insert(coordinates[split:, 0], coordinates[split:, 1])
+
+    reference = reference_dbscan(coordinates)
+    core = core_mask(reference)
+    np.testing.assert_array_equal(model.core_mask, core)
+    assert_same_partition(model.labels[core], reference.labels_[core])
+
+
+@pytest.mark.parametrize('step', [7, 2])
+def test_deletes_match_precomputed_dbscan(coordinates, step):
+    # Every 7th point stays below BATCH_QUERY_MIN_POINTS, every 2nd goes above it
+    model = IncrementalDBSCAN(eps_km=EPS_KM, min_samples=MIN_SAMPLES)
+    model.insert(coordinates[:, 0], coordinates[:, 1])
+    deleted = np.arange(0, len(coordinates), step)
+    model.delete(deleted)
+
+    kept = np.setdiff1d(np.arange(len(coordinates)), deleted)
+    reference = reference_dbscan(coordinates[kept])
+    core = core_mask(reference)
+    assert not model.active_mask[deleted].any()
+    assert (model.labels[deleted] == -1).all()
+    np.testing.assert_array_equal(model.core_mask[kept], core)
+    np.testing.assert_array_equal(model.labels[kept] == -1, reference.labels_ == -1)
+    assert_same_partition(model.labels[kept][core], reference.labels_[core])
+    assert model.summary()['total_points'] == len(kept)
@@ -0,0 +1,146 @@
+import io
+import json
+import struct
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import (CHUNK_SIZE, PACKED_ALIGNMENT, PACKED_MAGIC, PACKED_TYPES, iter_json_array, iter_ndjson,
+                    peek_json_body, read_packed_columns, read_report_stream)
+
+
+def make_reports(n: int, seed: int = 3) -> List[Dict[str, Any]]:
+    # Reports as the kiosks send them, with missing and non-ASCII values and a field
+    # the analysis drops
+    rng = np.random.default_rng(seed)
+    products = ['Paracetamol 500mg', 'Amoxicilina 250mg', 'Café Tonic', None]
+    return [{
+        '_id': f'report_{i:07d}',
+        'lat': round(float(rng.uniform(14.4, 14.8)), 6),
+        'long': round(float(rng.uniform(120.9, 121.1)), 6),
+        'product': products[i % len(products)],
+        'scannedBy': f'user_{i % 7:04d}',
+        'scannedAt': f'2024-01-{1 + i % 28:02d}T{i % 24:02d}:15:00Z',
+        'scanResult': int(i % 3 == 0),
+        'remarks': 'ok'
+    } for i in range(n)]
+
+
+def test_ndjson_round_trip_across_chunks():
+    reports = make_reports(1000)
+    lines = [json.dumps(report, ensure_ascii=False) for report in reports]
+    body = '\r\n'.join(lines[:500]).encode() + b'\n\n  \n' + '\n'.join(lines[500:]).encode()
+    assert len(body) > 2 * CHUNK_SIZE
+    assert list(iter_ndjson(io.BytesIO(body))) == reports
+
+
+def test_ndjson_reports_the_invalid_line():
+    body = b'{"lat": 1, "long": 2}\n\n{"lat": \n'
+    with pytest.raises(ValueError, match='line 3'):
+        list(iter_ndjson(io.BytesIO(body)))
+
+
+def test_json_array_round_trip_across_chunks():
+    reports = make_reports(1000)
+    body = b' \n' + json.dumps(reports, ensure_ascii=False, indent=1).encode()
+    assert len(body) > 2 * CHUNK_SIZE
+
+    stream = io.BytesIO(body)
+    head, first_char = peek_json_body(stream)
+    assert first_char == '['
+    assert list(iter_json_array(stream, head)) == reports
+    assert list(iter_json_array(io.BytesIO(b'[ ]'))) == []
+
+
+def test_json_array_rejects_malformed_bodies():
+    for body in (b'{"reports": []}', b'[{"lat": 1} {"lat": 2}]', b'[{"lat": 1},'):
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.BytesIO(body)))
+
+
+def test_report_columns_grow_past_their_capacity():
+    reports = make_reports(300)
+    columns = read_report_stream(iter(reports), 16)
+    assert len(columns) == len(reports)
+    np.testing.assert_array_equal(columns.latitude[:len(columns)], [report['lat'] for report in reports])
+    np.testing.assert_array_equal(columns.columns['_id'][:len(columns)], [report['_id'] for report in reports])
+    with pytest.raises(ValueError):
+        read_report_stream(iter([1]), 4)
+
+
+def pack_columns(rows: int, columns: Sequence[Dict[str, Any]]) -> bytes:
+    # Writer for the packed layout read_packed_columns decodes: each column is
+    # {'name', 'type', 'data'} plus 'values' for dictionary columns (types the reader
+    # does not know are written as float64)
+    header = json.dumps({'rows': rows, 'columns': [{key: value for key, value in column.items() if key != 'data'}
+                                                   for column in columns]}).encode()
+    body = bytearray(PACKED_MAGIC + struct.pack('<I', len(header)) + header)
+    for column in columns:
+        body += b'\0' * (-len(body) % PACKED_ALIGNMENT)
+        body += np.asarray(column['data'], dtype=PACKED_TYPES.get(column['type'], '<f8')).tobytes()
+    return bytes(body)
+
+
+def dictionary_column(name: str, values: Sequence[Optional[str]]) -> Dict[str, Any]:
+    table = sorted({value for value in values if value is not None})
+    codes = [table.index(value) if value is not None else -1 for value in values]
+    return {'name': name, 'type': 'dictionary', 'values': table, 'data': codes}
+
+
+def packed_reports(reports: List[Dict[str, Any]], coordinate_type: str = 'float64') -> bytes:
+    return pack_columns(len(reports), [
+        {'name': 'lat', 'type': coordinate_type, 'data': [report['lat'] for report in reports]},
+        {'name': 'long', 'type': coordinate_type, 'data': [report['long'] for report in reports]},
+        dictionary_column('_id', [report['_id'] for report in reports]),
+        dictionary_column('product', [report['product'] for report in reports]),
+        dictionary_column('scannedBy', [report['scannedBy'] for report in reports]),
+        dictionary_column('scannedAt', [report['scannedAt'] for report in reports]),
+        {'name': 'scanResult', 'type': 'int32', 'data': [report['scanResult'] for report in reports]}
+    ])
+
+
+def test_packed_columns_match_json_reports():
+    # Category order depends on how a body lists its values, not on the reports
+    reports = make_reports(200)
+    columns = read_packed_columns(packed_reports(reports))
+    assert len(columns) == len(reports)
+    np.testing.assert_array_equal(columns.latitude, [report['lat'] for report in reports])
+    np.testing.assert_array_equal(columns.longitude, [report['long'] for report in reports])
+    pd.testing.assert_frame_equal(columns.to_frame(), read_report_stream(iter(reports), 16).to_frame(),
+                                  check_categorical=False, check_dtype=False)
+
+
+def test_packed_float32_coordinates_widen_to_float64():
+    reports = make_reports(20)
+    columns = read_packed_columns(packed_reports(reports, coordinate_type='float32'))
+    assert columns.latitude.dtype == np.float64
+    np.testing.assert_array_equal(columns.latitude, np.float32([report['lat'] for report in reports]))
+
+
+def test_packed_dictionary_with_repeated_strings():
+    # Tables that repeat a string cannot become a categorical and are decoded per code
+    body = pack_columns(3, [
+        {'name': 'lat', 'type': 'float64', 'data': [14.6, 14.7, 14.8]},
+        {'name': 'long', 'type': 'float64', 'data': [121.0, 121.0, 121.0]},
+        {'name': 'product', 'type': 'dictionary', 'values': ['A', 'A', 'B'], 'data': [0, 1, -1]}
+    ])
+    product = read_packed_columns(body).to_frame()['product']
+    assert product.iloc[:2].tolist() == ['A', 'A'] and pd.isna(product.iloc[2])
+
+
+@pytest.mark.parametrize('body, message', [
+    (b'XXXX' + bytes(8), 'RCVC header'),
+    (PACKED_MAGIC + struct.pack('<I', 100) + b'{}', 'truncated'),
+    (PACKED_MAGIC + struct.pack('<I', 2) + b'[]', 'Invalid packed column header'),
+    (pack_columns(-1, []), 'Invalid packed column header'),
+    (PACKED_MAGIC + struct.pack('<I', 27) + b'{"rows": 1, "columns": [1]}', 'Invalid packed column header'),
+    (PACKED_MAGIC + struct.pack('<I', 28) + b'{"rows": 1, "columns": "ab"}', 'Invalid packed column header'),
+    (pack_columns(2, [{'name': 'lat', 'type': 'float16', 'data': []}]), 'Unsupported'),
+    (pack_columns(4, [{'name': 'lat', 'type': 'float64', 'data': [1.0, 2.0]}]), 'truncated'),
+    (pack_columns(1, [{'name': 'product', 'type': 'dictionary', 'values': ['A'], 'data': [1]}]), 'out of range')
+])
+def test_packed_columns_reject_malformed_bodies(body, message):
+    with pytest.raises(ValueError, match=message):
+        read_packed_columns(body)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import EPS_KM, MIN_SAMPLES, assert_same_partition, reference_dbscan
+from engine import AnalyticsProcessor
+from partitioned import partitioned_dbscan
+
+
+@pytest.mark.parametrize('n_partitions', [1, 4, 9])
+def test_partitioned_matches_precomputed_dbscan(coordinates, n_partitions):
+    labels = partitioned_dbscan(coordinates, EPS_KM, MIN_SAMPLES, max_workers=1, n_partitions=n_partitions)
+    np.testing.assert_array_equal(labels, reference_dbscan(coordinates).labels_)
+
+
+def test_partitioned_weights_match_repeated_points(coordinates):
+    unique, inverse, counts = np.unique(coordinates, axis=0, return_inverse=True, return_counts=True)
+    labels = partitioned_dbscan(unique, EPS_KM, MIN_SAMPLES, sample_weight=counts.astype(np.float64),
+                                max_workers=1, n_partitions=4)
+    assert_same_partition(labels[inverse.ravel()], reference_dbscan(coordinates).labels_)
+
+
+@pytest.mark.parametrize('neighbor_backend', ['dense', 'graph', 'partitioned'])
+@pytest.mark.parametrize('collapse_points', [False, True])
+def test_engine_backends_match_precomputed_dbscan(coordinates, neighbor_backend, collapse_points):
+    processor = AnalyticsProcessor()
+    processor.data = pd.DataFrame({'latitude': coordinates[:, 0], 'longitude': coordinates[:, 1]})
+    results = processor.dbscan_clustering(eps_km=EPS_KM, min_samples=MIN_SAMPLES, neighbor_backend=neighbor_backend,
+                                          n_jobs=1, include_points=False, collapse_points=collapse_points)
+    assert results['clustering_params']['neighbor_backend'] == neighbor_backend
+    np.testing.assert_array_equal(processor.clusters, reference_dbscan(coordinates).labels_)
@@ -0,0 +1,39 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import iter_ndjson, read_report_stream
+from schema import decode_reports
+from test_ingest import make_reports
+
+
+def test_reports_decode_to_typed_columns():
+    reports = make_reports(50) + [{'lat': '14.6', 'long': 'x', 'product': None, 'scannedAt': 'yesterday'}]
+    frame = decode_reports(reports)
+    assert list(frame.columns) == ['latitude', 'longitude', '_id', 'product', 'scannedBy', 'scanResult', 'scannedAt']
+    assert frame['latitude'].dtype == np.float64
+    assert frame['latitude'].iloc[-1] == 14.6 and np.isnan(frame['longitude'].iloc[-1])
+    assert isinstance(frame['product'].dtype, pd.CategoricalDtype)
+    assert frame['product'].isna().sum() == sum(report.get('product') is None for report in reports)
+    assert str(frame['scannedAt'].dt.tz) == 'UTC'
+    assert frame['scannedAt'].iloc[0] == pd.Timestamp(reports[0]['scannedAt'])
+    assert pd.isna(frame['scannedAt'].iloc[-1])
+
+
+def test_reports_without_coordinates_are_rejected():
+    with pytest.raises(ValueError, match='lat'):
+        decode_reports([{'product': 'A'}])
+    with pytest.raises(ValueError, match='JSON object'):
+        decode_reports([{'lat': 1, 'long': 2}, 3])
+
+
+def test_streamed_reports_match_decoded_reports():
+    # Columns filled report by report end up as the same typed frame
+    reports = make_reports(300)
+    body = '\n'.join(json.dumps(report) for report in reports).encode()
+    frame = read_report_stream(iter_ndjson(io.BytesIO(body)), 16).to_frame()
+    assert 'remarks' not in frame.columns
+    pd.testing.assert_frame_equal(frame, decode_reports(reports))
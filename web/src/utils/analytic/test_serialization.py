@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import serialization
+from serialization import iter_json, json_dumps
+
+VALUES = [
+    {'a': float('nan'), 'b': [1.5, float('inf'), -float('inf')], 'c': (np.float64('nan'), np.int64(3))},
+    {'array': np.array([1.0, np.nan]), 'time': pd.Timestamp('2024-01-01T00:00:00Z'), 'missing': pd.NaT},
+    {'product': pd.Categorical([None, 'A'])[0], 'nested': {'x': [np.float32(0.5), None, True]}},
+    {'big': 2 ** 70, 'text': 'Café'}
+]
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_fallback_encoder_writes_valid_json(value):
+    decoded = json.loads(json_dumps(value), parse_constant=lambda token: pytest.fail(f'bare {token}'))
+    assert decoded == json.loads(serialization.dumps(value))
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason='orjson not installed')
+@pytest.mark.parametrize('value', VALUES[:3])
+def test_fallback_encoder_matches_orjson(value):
+    assert json.loads(json_dumps(value)) == json.loads(serialization.orjson.dumps(
+        value, default=serialization.default, option=serialization.ORJSON_OPTIONS))
+
+
+def test_streamed_body_matches_dumps():
+    value = {'results': [{'id': i, 'score': float('nan') if i % 7 == 0 else i / 3} for i in range(5000)]}
+    assert b''.join(iter_json(value)) == serialization.dumps(value) + b'\n'
@@ -0,0 +1,99 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalDBSCAN
+
+
+def parse_duration(value: Any) -> pd.Timedelta:
+    # '24h', '7d', '30d', '90min', ... or a number of seconds
+    try:
+        duration = pd.Timedelta(seconds=value) if isinstance(value, (int, float)) else pd.Timedelta(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid duration: {value}")
+    if pd.isna(duration) or duration <= pd.Timedelta(0):
+        raise ValueError(f"Duration must be positive: {value}")
+    return duration
+
+
+class SlidingWindowClustering:
+    # DBSCAN over the reports scanned within a window of fixed length ending at a
+    # moving time (naive UTC datetime64). Reports are kept sorted by scannedAt;
+    # sliding the window forward inserts the reports that entered it and deletes the
+    # ones that left, so each step only touches the neighborhoods of those reports.
+    # Cluster ids are stable from one step to the next.
+
+    def __init__(self, timestamps: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray,
+                 length: np.timedelta64, eps_km: float, min_samples: int):
+        order = np.argsort(timestamps, kind='stable')
+        self.times = np.asarray(timestamps)[order]
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)[order]
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)[order]
+        self.length = length
+        self.model = IncrementalDBSCAN(eps_km=eps_km, min_samples=min_samples)
+
+        # Sorted positions of the points in the model, in model index order (always
+        # increasing); points before _expired have already left the window
+        self._positions = np.empty(0, dtype=np.int64)
+        self._inserted_until = 0
+        self._expired = 0
+        self.end: Optional[np.datetime64] = None
+
+    def advance(self, end: np.datetime64) -> None:
+        # Move the window to (end - length, end]; ends must not go backwards
+        if self.end is not None and end < self.end:
+            raise ValueError("Window end times must be increasing")
+        self.end = end
+
+        lo = int(np.searchsorted(self.times, end - self.length, side='right'))
+        hi = int(np.searchsorted(self.times, end, side='right'))
+
+        expire_until = int(np.searchsorted(self._positions, lo))
+        if expire_until > self._expired:
+            self.model.delete(np.arange(self._expired, expire_until))
+            self._expired = expire_until
+
+        # Reports that both entered and left since the last step are skipped
+        first = max(self._inserted_until, lo)
+        if hi > first:
+            self.model.insert(self.latitudes[first:hi], self.longitudes[first:hi])
+            self._positions = np.concatenate([self._positions, np.arange(first, hi)])
+        self._inserted_until = max(self._inserted_until, hi)
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Model summary plus size and centroid of every cluster in the current window
+        index = np.arange(self._expired, len(self._positions))
+        labels = self.model.labels[index]
+        positions = self._positions[index]
+        clustered = labels >= 0
+
+        clusters: List[Dict[str, Any]] = []
+        if clustered.any():
+            cluster_ids, group, sizes = np.unique(labels[clustered], return_inverse=True, return_counts=True)
+            center_lat = np.bincount(group, weights=self.latitudes[positions[clustered]]) / sizes
+            center_lng = np.bincount(group, weights=self.longitudes[positions[clustered]]) / sizes
+            for k in np.argsort(-sizes, kind='stable'):
+                clusters.append({
+                    'cluster_id': int(cluster_ids[k]),
+                    'size': int(sizes[k]),
+                    'center': {'latitude': float(center_lat[k]), 'longitude': float(center_lng[k])}
+                })
+
+        return {
+            'start': pd.Timestamp(self.end - self.length).tz_localize('UTC').isoformat(),
+            'end': pd.Timestamp(self.end).tz_localize('UTC').isoformat(),
+            'summary': self.model.summary(),
+            'clusters': clusters
+        }
+
+
+def window_end_times(first: np.datetime64, last: np.datetime64, end: Optional[np.datetime64],
+                     step: Optional[pd.Timedelta], max_steps: int) -> List[np.datetime64]:
+    # Window end times in increasing order: just `end` (default: the latest report),
+    # or up to max_steps ends spaced by step and finishing at `end`
+    end = last if end is None else end
+    if step is None:
+        return [end]
+    n_steps = max(1, min(max_steps, int((end - first) // step.to_timedelta64()) + 1))
+    return [end - step.to_timedelta64() * k for k in reversed(range(n_steps))]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+from typing import List, Dict, Any
+
+import numpy as np
+
+# Metro Manila bounding box, as in main.sample_workflow
+MIN_LAT, MAX_LAT = 14.3, 14.8
+MIN_LNG, MAX_LNG = 120.8, 121.2
+
+# Default shape of a generated workload. Fractions are of all reports; whatever is
+# left after the store, kiosk and malformed shares is scattered over the whole box.
+WORKLOAD_DEFAULTS = {
+    'n_stores': 1500,            # hotspot centers; report volume per store is Zipf-skewed
+    'store_skew': 0.9,           # Zipf exponent of store popularity
+    'store_spread_km': (0.1, 0.5),   # range of per-store scatter (std dev of the offsets)
+    'store_fraction': 0.65,
+    'n_kiosks': 150,             # fixed scanning kiosks: reports repeat their exact coordinates
+    'kiosk_fraction': 0.2,
+    'n_products': 250,
+    'product_skew': 1.3,         # a handful of products dominate the scans
+    'n_users': 2000,
+    'user_skew': 1.0,
+    'days': 30,
+    'start': '2024-01-01T00:00:00',
+    'burst_fraction': 0.25,      # reports packed into short promo/restock bursts
+    'n_bursts': 60,
+    'burst_minutes': 45.0,       # mean spread of a burst around its peak
+    'string_coordinate_fraction': 0.3,  # coordinates sent as strings, as some clients do
+    'malformed_fraction': 0.02,
+    'scan_result_weights': (0.86, 0.1, 0.04)
+}
+
+# Share of each hour of the (UTC+8) day in regular traffic: quiet nights, lunch and
+# after-work peaks
+HOURLY_WEIGHTS = np.array([1, 0.5, 0.3, 0.2, 0.2, 0.5, 1.5, 3, 4, 4.5, 5, 6,
+                           7, 6, 5, 4.5, 5, 6.5, 7.5, 7, 5.5, 4, 3, 2], dtype=np.float64)
+LOCAL_UTC_OFFSET_HOURS = 8
+
+# Ways coordinates arrive broken in production, drawn uniformly for malformed reports
+MALFORMED_KINDS = ('missing', 'null', 'empty', 'text', 'zero', 'swapped', 'out_of_range')
+
+KM_PER_DEGREE = 111.32
+
+WORKLOADS = ('realistic', 'uniform')
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def generate_coordinates(n: int, rng: np.random.Generator, options: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    # Latitudes and longitudes (rounded to 6 decimals, like GPS payloads) plus the
+    # store index of hotspot reports (-1 for kiosk and background reports)
+    latitude = rng.uniform(MIN_LAT, MAX_LAT, n)
+    longitude = rng.uniform(MIN_LNG, MAX_LNG, n)
+    source = rng.choice(3, size=n, p=[options['store_fraction'], options['kiosk_fraction'],
+                                      1 - options['store_fraction'] - options['kiosk_fraction']])
+
+    # Stores: Zipf-popular centers with their own scatter radius
+    n_stores = options['n_stores']
+    store_lat = rng.uniform(MIN_LAT, MAX_LAT, n_stores)
+    store_lng = rng.uniform(MIN_LNG, MAX_LNG, n_stores)
+    store_spread = rng.uniform(*options['store_spread_km'], n_stores) / KM_PER_DEGREE
+    store = np.full(n, -1, dtype=np.int64)
+    at_store = np.flatnonzero(source == 0)
+    store[at_store] = rng.choice(n_stores, size=len(at_store), p=zipf_weights(n_stores, options['store_skew']))
+    spread = store_spread[store[at_store]]
+    latitude[at_store] = store_lat[store[at_store]] + rng.normal(0, 1, len(at_store)) * spread
+    longitude[at_store] = (store_lng[store[at_store]]
+                           + rng.normal(0, 1, len(at_store)) * spread / np.cos(np.radians(store_lat[store[at_store]])))
+
+    # Kiosks sit next to stores and report the exact same coordinates every time
+    n_kiosks = options['n_kiosks']
+    kiosk_store = rng.choice(n_stores, size=n_kiosks)
+    kiosk_lat = np.round(store_lat[kiosk_store] + rng.normal(0, 0.0003, n_kiosks), 6)
+    kiosk_lng = np.round(store_lng[kiosk_store] + rng.normal(0, 0.0003, n_kiosks), 6)
+    at_kiosk = np.flatnonzero(source == 1)
+    kiosk = rng.choice(n_kiosks, size=len(at_kiosk), p=zipf_weights(n_kiosks, 0.8))
+    latitude[at_kiosk] = kiosk_lat[kiosk]
+    longitude[at_kiosk] = kiosk_lng[kiosk]
+
+    return {'latitude': np.round(latitude, 6), 'longitude': np.round(longitude, 6), 'store': store}
+
+
+def generate_scan_times(n: int, rng: np.random.Generator, options: Dict[str, Any]) -> np.ndarray:
+    # datetime64[s] in UTC: regular traffic follows the daily curve on every day of
+    # the period, bursts pile reports around a few random peaks
+    start = np.datetime64(options['start'], 's')
+    days = rng.integers(0, options['days'], n)
+    local_hour = rng.choice(24, size=n, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    seconds = (days * 86400 + (local_hour - LOCAL_UTC_OFFSET_HOURS) * 3600
+               + rng.integers(0, 3600, n)).astype(np.float64)
+
+    bursty = rng.random(n) < options['burst_fraction']
+    peaks = rng.uniform(0, options['days'] * 86400, options['n_bursts'])
+    peak = rng.choice(options['n_bursts'], size=int(bursty.sum()), p=zipf_weights(options['n_bursts'], 0.7))
+    seconds[bursty] = peaks[peak] + rng.laplace(0, options['burst_minutes'] * 60, len(peak))
+
+    seconds = np.clip(seconds, 0, options['days'] * 86400 - 1)
+    return start + seconds.astype('timedelta64[s]')
+
+
+def malform(report: Dict[str, Any], kind: str) -> None:
+    if kind == 'missing':
+        del report['lat'], report['long']
+    elif kind == 'null':
+        report['lat'] = None
+    elif kind == 'empty':
+        report['long'] = ''
+    elif kind == 'text':
+        report['lat'], report['long'] = 'N/A', 'N/A'
+    elif kind == 'zero':
+        report['lat'], report['long'] = 0, 0
+    elif kind == 'swapped':
+        report['lat'], report['long'] = report['long'], report['lat']
+    elif kind == 'out_of_range':
+        report['lat'] = 999.0
+
+
+def generate_workload(n: int, seed: int = 42, **overrides: Any) -> List[Dict[str, Any]]:
+    # n scan reports shaped like production traffic; the same seed and options always
+    # give the same reports
+    unknown = set(overrides) - set(WORKLOAD_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown workload options: {sorted(unknown)}")
+    options = {**WORKLOAD_DEFAULTS, **overrides}
+    if options['store_fraction'] + options['kiosk_fraction'] > 1:
+        raise ValueError("store_fraction and kiosk_fraction must add up to at most 1")
+
+    rng = np.random.default_rng(seed)
+    coordinates = generate_coordinates(n, rng, options)
+    scanned_at = generate_scan_times(n, rng, options)
+
+    # Few products and heavy users account for most scans
+    products = [f"Product {k:03d}" for k in range(options['n_products'])]
+    product = rng.choice(options['n_products'], size=n, p=zipf_weights(options['n_products'], options['product_skew']))
+    user = rng.choice(options['n_users'], size=n, p=zipf_weights(options['n_users'], options['user_skew']))
+    scan_result = rng.choice(len(options['scan_result_weights']), size=n, p=options['scan_result_weights'])
+    as_string = rng.random(n) < options['string_coordinate_fraction']
+    malformed = np.flatnonzero(rng.random(n) < options['malformed_fraction'])
+    malformed_kind = rng.choice(len(MALFORMED_KINDS), size=len(malformed))
+
+    latitude = coordinates['latitude'].tolist()
+    longitude = coordinates['longitude'].tolist()
+    timestamps = np.datetime_as_string(scanned_at, unit='s')
+    reports = []
+    for i in range(n):
+        lat, lng = latitude[i], longitude[i]
+        reports.append({
+            '_id': f"report_{i + 1:07d}",
+            'lat': str(lat) if as_string[i] else lat,
+            'long': str(lng) if as_string[i] else lng,
+            'product': products[product[i]],
+            'scannedBy': f"user_{user[i]:04d}",
+            'scannedAt': f"{timestamps[i]}Z",
+            'scanResult': int(scan_result[i])
+        })
+    for i, kind in zip(malformed.tolist(), malformed_kind.tolist()):
+        malform(reports[i], MALFORMED_KINDS[kind])
+    return reports
+
+
+def generate_uniform_workload(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    # Clean reports spread uniformly over the box, like main.sample_workflow; a best
+    # case for comparison with the realistic workload
+    rng = np.random.default_rng(seed)
+    latitude = np.round(rng.uniform(MIN_LAT, MAX_LAT, n), 6).tolist()
+    longitude = np.round(rng.uniform(MIN_LNG, MAX_LNG, n), 6).tolist()
+    product = rng.integers(0, 5, n)
+    scan_result = rng.integers(0, 3, n)
+    scanned_at = np.datetime_as_string(np.datetime64(WORKLOAD_DEFAULTS['start'], 's')
+                                       + rng.integers(0, 30 * 86400, n).astype('timedelta64[s]'), unit='s')
+    return [{
+        '_id': f"report_{i + 1:07d}",
+        'lat': latitude[i],
+        'long': longitude[i],
+        'product': f"Product {product[i]:03d}",
+        'scannedBy': f"user_{i % 50:04d}",
+        'scannedAt': f"{scanned_at[i]}Z",
+        'scanResult': int(scan_result[i])
+    } for i in range(n)]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a realistic synthetic scan-report workload")
+    parser.add_argument('--reports', type=int, default=10_000, help="Number of reports")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workload', choices=WORKLOADS, default='realistic')
+    parser.add_argument('--format', choices=('json', 'ndjson', 'request'), default='ndjson',
+                        help="json: a report array; ndjson: one report per line; "
+                             "request: a /v1/analyze body with a reports key")
+    parser.add_argument('--output', help="Output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    generate = generate_workload if args.workload == 'realistic' else generate_uniform_workload
+    reports = generate(args.reports, args.seed)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.format == 'ndjson':
+            for report in reports:
+                out.write(json.dumps(report) + '\n')
+        elif args.format == 'json':
+            json.dump(reports, out)
+        else:
+            json.dump({'reports': reports}, out)
+    finally:
+        if args.output:
+            out.close()
+            print(f"✓ {len(reports)} reports written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()